@@ -3,19 +3,28 @@ import time
 import random
 import os
 import numpy as np
-import librosa
-import soundfile as sf
 import uuid
 import json
 import sys
 import logging
-import subprocess
-import requests
+import argparse
 from datetime import datetime
-from multiprocessing import Process, cpu_count
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 
+from clip_cache import ClipCache
+from clip_store import ClipStore
+from config_client import ConfigClient
+from voice_index import get_voice_index
+from plan import TrackPlan, iter_render, plan_peak, render_plan
+from effects import EffectSettings
+from noise import NoiseLibrary, NoiseMixer, parse_noise_spec
+from loudness import LoudnessMeter, PeakMeter, TruePeakLimiter
+from encoders import EncoderError, WavEncoder, select_encoder
+from scheduler import JobScheduler
+from seeding import job_seeds, new_seed, seed_metadata
+
 # ==========================
 # LOGGING SETUP
 # ==========================
@@ -33,6 +42,7 @@ BASE_DIR = Path(__file__).parent.resolve()
 OUTPUT_ROOT = BASE_DIR / "output"
 VOICES_DIR = BASE_DIR / "agent_voices" / "profile"
 PROFILES_FILE = BASE_DIR / "profiles.json"
+STORE_DIR = BASE_DIR / "agent_voices" / "store"
 BG_NOISE_DIR = BASE_DIR / "bg_noise"
 
 # ==========================
@@ -40,13 +50,47 @@ BG_NOISE_DIR = BASE_DIR / "bg_noise"
 # ==========================
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8080")
 API_TIMEOUT = 10  # seconds
+CONFIG_CACHE_FILE = BASE_DIR / "cache" / "accounts.json"
+CONFIG_CACHE_TTL = 60 * 60  # seconds; expired entries are still used if the API is down
+config_client = ConfigClient(API_BASE_URL, API_TIMEOUT, CONFIG_CACHE_FILE, CONFIG_CACHE_TTL, PROFILES_FILE)
 
 # ==========================
 # AUDIO QUALITY SETTINGS
 # ==========================
 SAMPLE_RATE = 24000  # Optimized for Discord Voice (High Quality / Low Size)
-OUTPUT_FORMAT = "ogg" # We will attempt OGG (Opus) via FFmpeg
-FINAL_PEAK_NORMALIZATION = 0.95
+OUTPUT_FORMAT = "ogg" # OGG (Opus) in-process via libsndfile, else via FFmpeg
+OPUS_BITRATE = "48k"            # FFmpeg encoder
+OPUS_COMPRESSION_LEVEL = 0.83  # libsndfile encoder, ~48kbps at 24kHz
+FINAL_PEAK_CEILING = 0.95      # Output peak never exceeds this (see render_to_file)
+NORMALIZATION_MODE = "peak"   # "peak" (FINAL_PEAK_CEILING) or "lufs" (TARGET_LUFS, true-peak limited)
+TARGET_LUFS = -18.0           # Integrated loudness target in "lufs" mode
+TRUE_PEAK_CEILING_DB = -1.0   # Limiter ceiling (dBTP) in "lufs" mode
+MIC_COLOR_COEF = 0.95
+FADE_CHANCE = 0.25  # Probability of fading a clip out
+FADE_MIN = 0.7      # Fade end level range
+FADE_MAX = 0.9
+CLIP_EFFECTS = EffectSettings(fade_chance=FADE_CHANCE, fade_min=FADE_MIN, fade_max=FADE_MAX)
+STREAMING_RENDER = True     # Render/write in blocks instead of holding the whole track in RAM
+STREAM_BLOCK_SECONDS = 2.0  # Block size for streaming render
+BG_NOISE_LEVEL = 0.01         # Background noise bed level; specs like "fan+white_noise" mix several
+BG_NOISE_LEVELS = {}          # Per-bed level overrides, e.g. {"white_noise": 0.005}
+NOISE_CROSSFADE_SECONDS = 0.5 # Crossfade at each noise loop seam
+
+# ==========================
+# CLIP CACHE
+# ==========================
+CLIP_CACHE_BYTES = 512 * 1024 * 1024  # Decoded clips kept in RAM per process
+REFRESH_CLIP_STORE = True  # Incrementally re-decode changed clips (+ mic_color variant) into STORE_DIR on startup
+clip_store = ClipStore(VOICES_DIR, STORE_DIR)
+clip_cache = ClipCache(max_bytes=CLIP_CACHE_BYTES, store=clip_store)
+noise_library = NoiseLibrary(BG_NOISE_DIR, SAMPLE_RATE, NOISE_CROSSFADE_SECONDS, clip_cache)
+
+# ==========================
+# PARALLELISM
+# ==========================
+MAX_WORKERS = None                    # None = from CPU count and free memory; 1 = render serially
+JOB_MEMORY_BYTES = 384 * 1024 * 1024  # Per-worker estimate: clip cache growth + render blocks
+PRELOAD_CLIPS = True                  # Decode a voice in the parent so forked workers share it
 
 # ==========================
 # DURATION SETTINGS
@@ -62,36 +106,101 @@ ROUND_SEQUENCE = ["greetings", "round_start", "strategy", "enemy_info", "random"
 PLAY_PROBABILITY = {"greetings": 0.6, "round_start": 0.85, "strategy": 0.7, "enemy_info": 0.8, "random": 0.4, "round_result": 1.0}
 INTENSITY = {"greetings": 0.2, "round_start": 0.35, "strategy": 0.45, "enemy_info": 0.8, "random": 0.25, "round_result": 0.5}
 
+# ==========================
+# PROGRESS REPORTING
+# ==========================
+PROGRESS_PREFIX = "PROGRESS"  # stdout lines the Node server parses as JSON events
+PROGRESS_STEP = 0.05          # Report every 5% of the target duration
+SAVE_PLANS = False            # Write <file_id>.plan.json next to each output
+
+# ==========================
+# GENERATION STATE
+# ==========================
+
+class GenerationState:
+    """Planner state for one job: the event schedule with a running sample cursor.
+
+    Every random decision of the job is drawn from `rng`, so a seeded rng
+    reproduces the plan exactly.
+    """
+
+    def __init__(self, target_seconds: float, sample_rate: int = SAMPLE_RATE, energy: float = 0.3,
+                 rng: Optional[random.Random] = None):
+        self.plan = TrackPlan(sample_rate)
+        self.target_seconds = target_seconds
+        self.sample_rate = sample_rate
+        self.energy = energy
+        self.rng = rng or random.Random()
+
+    @property
+    def total_samples(self) -> int:
+        return self.plan.length
+
+    @property
+    def seconds(self) -> float:
+        return self.total_samples / self.sample_rate
+
+    @property
+    def done(self) -> bool:
+        return self.seconds >= self.target_seconds
+
+    @property
+    def progress(self) -> float:
+        if self.target_seconds <= 0:
+            return 1.0
+        return min(self.seconds / self.target_seconds, 1.0)
+
+def emit_event(event: str, **fields: Any) -> None:
+    """Write a machine-readable event line to stdout for the Node server."""
+    print(f"{PROGRESS_PREFIX} {json.dumps({'event': event, **fields})}", flush=True)
+
+class ProgressReporter:
+    """Emits a progress event each time rendering crosses another PROGRESS_STEP."""
+
+    def __init__(self, username: str, version: int, total_samples: int, sample_rate: int = SAMPLE_RATE):
+        self.username = username
+        self.version = version
+        self.total_samples = max(total_samples, 1)
+        self.sample_rate = sample_rate
+        self._next = PROGRESS_STEP
+
+    def __call__(self, samples_done: int) -> None:
+        progress = min(samples_done / self.total_samples, 1.0)
+        if progress < self._next:
+            return
+        self._next = (int(progress / PROGRESS_STEP) + 1) * PROGRESS_STEP
+        emit_event(
+            "progress",
+            username=self.username,
+            version=self.version,
+            seconds=round(samples_done / self.sample_rate, 1),
+            target_seconds=round(self.total_samples / self.sample_rate, 1),
+            progress=round(progress, 3),
+        )
+
 # ==========================
 # CORE AUDIO FUNCTIONS
 # ==========================
 
-def mic_color(audio: np.ndarray) -> np.ndarray:
-    """Crisp high-quality pre-emphasis for 24kHz."""
-    return librosa.effects.preemphasis(audio, coef=0.95)
+def load_clip(path: str) -> np.ndarray:
+    """Decoded + mic_color'd once per process, shared read-only."""
+    return clip_cache.get(path, SAMPLE_RATE, preemphasis=MIC_COLOR_COEF)
 
-def add_silence(seconds: float, state: Dict[str, Any]) -> None:
-    """Append silence to the list buffer (Memory efficient)."""
-    silence = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
-    state["audio_list"].append(silence)
+def add_silence(seconds: float, state: GenerationState) -> None:
+    """Schedule silence (just advances the plan cursor)."""
+    state.plan.add_silence(int(seconds * SAMPLE_RATE))
 
-def play_random_clip_from(source: str, state: Dict[str, Any], voice_type: str) -> bool:
-    folder = VOICES_DIR / voice_type / source
-    audio_extensions = {'.mp3', '.wav', '.ogg', '.flac'}
-    files = [f for f in folder.iterdir() if f.suffix.lower() in audio_extensions] if folder.exists() else []
+def play_random_clip_from(source: str, state: GenerationState, voice_type: str) -> bool:
+    # Profile folders are listed once per run, not per clip
+    file = get_voice_index(str(VOICES_DIR / voice_type)).choice(source, state.rng)
+    if file is None: return False
     
-    if not files: return False
-    
-    file = random.choice(files)
     try:
-        audio, _ = librosa.load(str(file), sr=SAMPLE_RATE)
-        # Apply FX
-        audio = mic_color(audio)
-        # Random Variation
-        if random.random() < 0.25: # Fade
-            audio = audio * np.linspace(1.0, random.uniform(0.7, 0.9), len(audio))
+        length = clip_cache.length(file, SAMPLE_RATE, preemphasis=MIC_COLOR_COEF)
+        # Random Variation (applied in one pass at render time)
+        length, gain, fade_to = CLIP_EFFECTS.sample(length, state.energy, state.rng)
         
-        state["audio_list"].append(audio)
+        state.plan.add_clip(file, length, gain=gain, fade_to=fade_to)
         return True
     except Exception as e:
         logger.error(f"Load error: {e}")
@@ -101,116 +210,163 @@ def play_random_clip_from(source: str, state: Dict[str, Any], voice_type: str) -
 # GENERATION ENGINE
 # ==========================
 
-def generate_round(state: Dict[str, Any], voice_type: str):
+def generate_round(state: GenerationState, voice_type: str):
+    rng = state.rng
     clips_added = 0
     for source in ROUND_SEQUENCE:
-        if random.random() > PLAY_PROBABILITY.get(source, 0.5):
+        if rng.random() > PLAY_PROBABILITY.get(source, 0.5):
             continue
         
         if play_random_clip_from(source, state, voice_type):
             clips_added += 1
             # Variable Pacing
-            r = random.random()
-            pause = random.uniform(3.0, 7.0)
-            # pause = random.uniform(0.1, 0.4) if r < 0.5 else random.uniform(0.5, 1.5)
+            pause = rng.uniform(3.0, 7.0)
             add_silence(pause, state)
             
-    add_silence(random.uniform(1.0, 3.0), state)
+    add_silence(rng.uniform(1.0, 3.0), state)
     return clips_added
 
-def generate_audio_job(username: str, voice_type: str, bg_noise: str, version: int):
-    # Initialize with list for RAM efficiency
-    state = {"audio_list": [], "energy": 0.3}
-    
-    target_seconds = BASE_DURATION_SECONDS + random.randint(EXTRA_DURATION_MIN, EXTRA_DURATION_MAX)
-    logger.info(f"[START] {username} v{version} | Target: {target_seconds//60}min")
+def noise_mixer(bg_noise: str, rng=random) -> NoiseMixer:
+    """Background beds for one render, each starting at a random offset drawn from `rng`."""
+    try:
+        return noise_library.mixer(bg_noise, BG_NOISE_LEVEL, BG_NOISE_LEVELS, rng)
+    except Exception as e:
+        logger.warning(f"Skipping background noise '{bg_noise}': {e}")
+        return NoiseMixer([])
+
+def loudness_normalized(render, sample_rate: int, on_progress=None):
+    """Yield blocks of `render()` gained to TARGET_LUFS and held under TRUE_PEAK_CEILING_DB.
+
+    `render(on_progress)` must produce the same blocks every time it is
+    called: the first pass only measures integrated loudness, the second is
+    gained and limited on its way to the encoder.
+    """
+    meter = LoudnessMeter(sample_rate)
+    for block in render(None):
+        meter.update(block)
+    loudness = meter.integrated()
+    gain = meter.gain(TARGET_LUFS)
+
+    limiter = TruePeakLimiter(sample_rate, TRUE_PEAK_CEILING_DB)
+    for block in render(on_progress):
+        yield limiter.process(block, gain)
+    yield limiter.flush()
+    logger.debug(f"Loudness {loudness:.1f} LUFS -> {TARGET_LUFS:.1f} LUFS, "
+                 f"limiter reduction {-20 * np.log10(limiter.min_gain):.1f} dB")
+
+def render_to_file(plan: TrackPlan, encoder, out_stem: Path, on_progress=None, bg_noise: str = "none",
+                   noise_seed: Optional[int] = None, metadata: Optional[Dict[str, str]] = None) -> Path:
+    """Render `plan` with `bg_noise` beds, normalized per NORMALIZATION_MODE, through `encoder`.
+
+    The beds' offsets come from `noise_seed`, so a render can be repeated exactly.
+    """
+    out_path = out_stem.with_suffix(encoder.extension)
+    noise = noise_mixer(bg_noise, random.Random(noise_seed))
+    # Speech is scaled so that speech peak + the beds' peak fits under the ceiling.
+    # The two rarely coincide, so a streamed mix with noise lands somewhat below
+    # it; measuring the exact mixed peak would take a second render pass
+    target = max(FINAL_PEAK_CEILING - noise.peak, 0.0)
+    block_size = int(STREAM_BLOCK_SECONDS * plan.sample_rate)
+
+    if STREAMING_RENDER:
+        # Speech gain comes from the plan, so the track is rendered and encoded block by block
+        peak = plan_peak(plan, load_clip)
+        scale = target / peak if peak > 0 else 1.0
+
+        def render(progress):
+            noise.reset()
+            for block in iter_render(plan, load_clip, block_size, scale, progress):
+                yield noise.mix(block)
+    else:
+        audio = render_plan(plan, load_clip, on_progress=on_progress)
+        
+        # Normalization
+        peak = np.max(np.abs(audio))
+        if peak > 0:
+            audio = (audio / peak) * target
+        if noise:
+            # The whole mix is in memory, so it can be brought up to the ceiling exactly
+            meter = PeakMeter()
+            meter.update(noise.mix(audio))
+            audio *= np.float32(meter.gain(FINAL_PEAK_CEILING))
+
+        def render(progress):
+            for start in range(0, len(audio), block_size):
+                yield audio[start:start + block_size]
+
+    if NORMALIZATION_MODE == "lufs":
+        blocks = loudness_normalized(render, plan.sample_rate, on_progress if STREAMING_RENDER else None)
+    else:
+        blocks = render(on_progress)
+
+    with encoder.open(out_path, plan.sample_rate, metadata=metadata) as writer:
+        for block in blocks:
+            writer.write(block)
+    return out_path
+
+def generate_audio_job(username: str, voice_type: str, bg_noise: str, version: int, encoder=None,
+                       seed: Optional[int] = None):
+    """Plan, render and encode one file. The same `seed` and voice store give the same bytes."""
+    encoder = encoder or select_encoder(SAMPLE_RATE, OPUS_BITRATE, OPUS_COMPRESSION_LEVEL)
+    seed = new_seed() if seed is None else seed
+    rng = random.Random(seed)
+    target_seconds = BASE_DURATION_SECONDS + rng.randint(EXTRA_DURATION_MIN, EXTRA_DURATION_MAX)
+    logger.info(f"[START] {username} v{version} | Target: {target_seconds//60}min | Seed: {seed}")
+
+    # Pass 1: plan the whole track (no audio is touched here)
+    state = GenerationState(target_seconds, rng=rng)
 
     total_clips = 0
-    while (sum(len(c) for c in state["audio_list"]) / SAMPLE_RATE) < target_seconds:
+    while not state.done:
         total_clips += generate_round(state, voice_type)
         if total_clips == 0: # Safety break if folders are empty
             logger.error("No clips found in folders!")
+            emit_event("failed", username=username, version=version, seed=seed, error="no clips found")
             return None
-
-    # Concatenate ONCE at the end
-    audio = np.concatenate(state["audio_list"])
-    
-    # Normalization
-    peak = np.max(np.abs(audio))
-    if peak > 0:
-        audio = (audio / peak) * FINAL_PEAK_NORMALIZATION
+    # Drawn once, so a fallback re-render mixes the same noise
+    noise_seed = rng.getrandbits(64)
 
     # Export Logic
     out_dir = OUTPUT_ROOT / username
     out_dir.mkdir(parents=True, exist_ok=True)
     file_id = f"{datetime.now().strftime('%Y%m%d')}_{str(uuid.uuid4())[:8]}"
     
-    wav_path = out_dir / f"{file_id}.wav"
-    ogg_path = out_dir / f"{file_id}.ogg"
-
-    # 1. Save as high-quality PCM_16 WAV (Smallest possible WAV)
-    sf.write(str(wav_path), audio, SAMPLE_RATE, subtype='PCM_16')
+    state.plan.metadata["seed"] = seed
+    if SAVE_PLANS:
+        state.plan.save(out_dir / f"{file_id}.plan.json")
 
-    # 2. Try to convert to OGG/Opus via FFmpeg
+    # Pass 2: render straight into the encoder (no intermediate WAV)
+    progress = ProgressReporter(username, version, state.total_samples)
     try:
-        subprocess.run([
-            'ffmpeg', '-i', str(wav_path), '-c:a', 'libopus', '-b:a', '48k', str(ogg_path), '-y'
-        ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        wav_path.unlink() # Delete WAV after successful OGG conversion
-        final_path = ogg_path
-        logger.info(f"[DONE] Saved OGG: {final_path.name} ({final_path.stat().st_size/(1024*1024):.1f}MB)")
-    except Exception:
-        final_path = wav_path # Keep WAV if FFmpeg fails
-        logger.warning(f"[DONE] FFmpeg failed, kept WAV: {final_path.name}")
+        final_path = render_to_file(state.plan, encoder, out_dir / file_id, on_progress=progress, bg_noise=bg_noise,
+                                    noise_seed=noise_seed, metadata=seed_metadata(seed))
+    except EncoderError as e:
+        if isinstance(encoder, WavEncoder):
+            raise
+        # Plans re-render deterministically, so fall back without keeping any audio around
+        logger.warning(f"{encoder.name} failed, writing WAV instead: {e}")
+        final_path = render_to_file(state.plan, WavEncoder(), out_dir / file_id, bg_noise=bg_noise,
+                                    noise_seed=noise_seed, metadata=seed_metadata(seed))
 
+    logger.info(f"[DONE] Saved {final_path.suffix[1:].upper()}: {final_path.name} ({final_path.stat().st_size/(1024*1024):.1f}MB)")
+    emit_event("done", username=username, version=version, path=str(final_path), seconds=round(state.seconds, 1),
+               seed=seed)
     return str(final_path)
 
 # ==========================
 # API FUNCTIONS
 # ==========================
 
+def fetch_user_configs(usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch configuration for many users (one batched request, cached on disk)."""
+    return config_client.fetch(usernames)
+
 def fetch_user_config(username: str) -> Optional[Dict[str, Any]]:
     """Fetch user configuration from API."""
-    try:
-        url = f"{API_BASE_URL}/api/accounts"
-        logger.info(f"Fetching config for: {username}")
-
-        response = requests.post(
-            url,
-            json={"usernames": [username]},
-            headers={"Content-Type": "application/json"},
-            timeout=API_TIMEOUT
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            accounts = data.get("accounts", [])
-
-            if accounts:
-                account = accounts[0]
-                logger.info(f"Found config for user: {username}")
-                return {
-                    "voice_type": account.get("voiceType", "real_brendan666"),
-                    "background_noise": account.get("backgroundNoise", "none"),
-                    "player_type": account.get("playerType", "player"),
-                    "discord_name": account.get("discordName", username)
-                }
-            else:
-                logger.warning(f"User '{username}' not found in database")
-                return None
-        else:
-            logger.error(f"API error: {response.status_code}")
-            return None
-    except requests.exceptions.ConnectionError:
-        logger.error(f"Cannot connect to API at {API_BASE_URL}")
-        return None
-    except requests.exceptions.Timeout:
-        logger.error(f"API request timeout after {API_TIMEOUT}s")
-        return None
-    except Exception as e:
-        logger.error(f"Error fetching config: {e}")
-        return None
+    config = fetch_user_configs([username]).get(username)
+    if config:
+        logger.info(f"Found config for user: {username}")
+    return config
 
 # ==========================
 # BOILERPLATE & RUNNER
@@ -218,55 +374,311 @@ def fetch_user_config(username: str) -> Optional[Dict[str, Any]]:
 
 def load_profiles():
     """Load profiles from JSON file (fallback)."""
-    if PROFILES_FILE.exists():
-        with open(PROFILES_FILE, 'r') as f: 
-            return json.load(f)
-    return {}
+    return config_client.load_profiles()
+
+def resolve_user_configs(usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+    """API config for every user (one request), falling back to profiles.json and then defaults."""
+    return config_client.resolve(usernames)
+
+def resolve_user_config(username: str) -> Dict[str, Any]:
+    """API config for `username`, falling back to profiles.json and then defaults."""
+    return resolve_user_configs([username])[username]
+
+_refreshed_voices = set()
+
+def refresh_clip_store(voice_type: str) -> None:
+    """Bring the voice's clip store up to date (once per process)."""
+    if not REFRESH_CLIP_STORE or voice_type in _refreshed_voices:
+        return
+    decoded, removed = clip_store.build(voice_type, SAMPLE_RATE, preemphasis=(MIC_COLOR_COEF,))
+    if decoded or removed:
+        logger.info(f"Clip store updated: {decoded} decoded, {removed} removed")
+    _refreshed_voices.add(voice_type)
+
+_preloaded_voices = set()
+
+_preloaded_noises = set()
+
+def preload_voice(voice_type: str) -> bool:
+    """Warm the clip cache with a voice (once) so forked workers inherit it; True if newly loaded."""
+    if not PRELOAD_CLIPS or voice_type in _preloaded_voices:
+        return False
+    _preloaded_voices.add(voice_type)
+    index = get_voice_index(str(VOICES_DIR / voice_type))
+    paths = [p for category in index.categories() for p in index.clips(category)]
+    loaded = clip_cache.preload(paths, SAMPLE_RATE, MIC_COLOR_COEF)
+    logger.info(f"Preloaded {loaded}/{len(paths)} clips for {voice_type}")
+    return True
+
+def preload_noise(bg_noise: str) -> bool:
+    """Prepare a config's noise beds in the parent so forked workers inherit them; True if any were new."""
+    if not PRELOAD_CLIPS:
+        return False
+    names = [name for name, _ in parse_noise_spec(bg_noise, BG_NOISE_LEVEL) if name not in _preloaded_noises]
+    for name in names:
+        _preloaded_noises.add(name)
+        noise_library.loop(name)
+    return bool(names)
+
+def create_scheduler() -> Optional[JobScheduler]:
+    """Process pool for rendering, or None when MAX_WORKERS == 1."""
+    if MAX_WORKERS == 1:
+        return None
+    return JobScheduler(MAX_WORKERS, JOB_MEMORY_BYTES)
+
+def submit_user_jobs(scheduler: JobScheduler, username: str, voice_type: str, bg_noise: str,
+                     num_audios: int, seed: Optional[int] = None) -> List[Future]:
+    """Queue `num_audios` renders for a user (seeds seed, seed+1, ...); each future resolves to a path or None."""
+    encoder = select_encoder(SAMPLE_RATE, OPUS_BITRATE, OPUS_COMPRESSION_LEVEL)
+    return [
+        scheduler.submit(generate_audio_job, username, voice_type, bg_noise, v, encoder, job_seed)
+        for v, job_seed in enumerate(job_seeds(num_audios, seed), start=1)
+    ]
+
+def collect_results(futures: List[Future]) -> List[str]:
+    """Wait for job futures and return the paths that were written."""
+    files = []
+    for future in futures:
+        try:
+            path = future.result()
+        except Exception as e:
+            logger.error(f"Job failed: {e}")
+            continue
+        if path:
+            files.append(path)
+    return files
+
+def run_jobs_for_user(username: str, voice_type: str, bg_noise: str, num_audios: int,
+                      scheduler: Optional[JobScheduler] = None, seed: Optional[int] = None) -> List[str]:
+    """Generate multiple audio files for a user, in parallel when given a scheduler.
+
+    With `seed`, file v is generated from seed + v - 1; otherwise every file gets a fresh seed.
+    """
+    if scheduler is not None:
+        return collect_results(submit_user_jobs(scheduler, username, voice_type, bg_noise, num_audios, seed))
+
+    encoder = select_encoder(SAMPLE_RATE, OPUS_BITRATE, OPUS_COMPRESSION_LEVEL)
+    files = []
+    for v, job_seed in enumerate(job_seeds(num_audios, seed), start=1):
+        path = generate_audio_job(username, voice_type, bg_noise, v, encoder, job_seed)
+        if path:
+            files.append(path)
+    return files
 
-def run_jobs_for_user(username: str, voice_type: str, bg_noise: str, num_audios: int):
-    """Generate multiple audio files for a user."""
-    for v in range(1, num_audios + 1):
-        generate_audio_job(username, voice_type, bg_noise, v)
+def run_worker(stream=None) -> None:
+    """Serve JSON job lines from stdin until EOF or a shutdown message.
+
+    Each line is {"id": ..., "username": ..., "count": N} with optional
+    "voice_type"/"background_noise" overrides and a base "seed". Every job is answered with a
+    'result' event. Imports, voice indexes and clip caches stay warm across jobs.
+    """
+    stream = stream or sys.stdin
+    scheduler: Optional[JobScheduler] = None
+    emit_event("ready", pid=os.getpid())
+
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                emit_event("result", id=None, ok=False, error=f"Invalid job line: {e}")
+                continue
+
+            if job.get("type") == "shutdown":
+                break
+
+            job_id = job.get("id")
+            username = job.get("username")
+            if not username:
+                emit_event("result", id=job_id, ok=False, error="Missing username")
+                continue
+
+            try:
+                count = int(job.get("count", 1))
+                config = resolve_user_config(username)
+                voice_type = job.get("voice_type") or config.get("voice_type", "real_brendan666")
+                bg_noise = job.get("background_noise") or config.get("background_noise", "none")
+
+                logger.info(f"[WORKER] Job {job_id}: {username} x{count} ({voice_type})")
+                refresh_clip_store(voice_type)
+                if MAX_WORKERS != 1:
+                    # Pool processes fork on first submit and never see later preloads, so
+                    # restart the (idle) pool whenever this job warmed something new.
+                    warmed = preload_voice(voice_type) | preload_noise(bg_noise)
+                    if scheduler is not None and warmed:
+                        logger.info(f"[WORKER] Restarting pool to share newly preloaded {voice_type}/{bg_noise}")
+                        scheduler.shutdown()
+                        scheduler = None
+                    if scheduler is None:
+                        scheduler = create_scheduler()
+                seed = job.get("seed")
+                files = run_jobs_for_user(username, voice_type, bg_noise, count, scheduler,
+                                          None if seed is None else int(seed))
+                emit_event("result", id=job_id, username=username, ok=len(files) == count, files=files,
+                           error=None if len(files) == count else f"{count - len(files)} file(s) failed")
+            except Exception as e:
+                logger.exception(f"[WORKER] Job {job_id} failed")
+                emit_event("result", id=job_id, username=username, ok=False, error=str(e))
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown()
+    logger.info(f"[WORKER] Shutting down (clip cache: {clip_cache.hits} hits, {clip_cache.misses} misses)")
+
+def load_manifest(path: Path, default_count: int = 1) -> Dict[str, int]:
+    """Read a batch manifest into {username: count}.
+
+    Accepts a JSON object ({"user": 5, ...}), a JSON list of usernames or
+    {"username": ..., "count": ...} entries, or plain text with one
+    `username [count]` per line ('#' starts a comment).
+    """
+    text = Path(path).read_text()
+    entries: Dict[str, int] = {}
+
+    if Path(path).suffix == ".json":
+        data = json.loads(text)
+        if isinstance(data, dict):
+            items = data.items()
+        else:
+            items = [
+                (e, default_count) if isinstance(e, str) else (e["username"], e.get("count", default_count))
+                for e in data
+            ]
+    else:
+        items = []
+        for line in text.splitlines():
+            fields = line.split("#", 1)[0].split()
+            if fields:
+                items.append((fields[0], fields[1] if len(fields) > 1 else default_count))
+
+    for username, count in items:
+        entries[username] = entries.get(username, 0) + int(count)
+    return entries
+
+def log_batch_summary(results: Dict[str, List[str]], requested: Dict[str, int], elapsed: float) -> None:
+    """Log a per-user table of files written vs requested."""
+    logger.info("=" * 50)
+    logger.info(f"Batch summary ({elapsed/60:.1f}min)")
+    for username, count in requested.items():
+        written = len(results.get(username, []))
+        mark = "✓" if written == count else "❌"
+        logger.info(f"  {mark} {username}: {written}/{count}")
+    total = sum(requested.values())
+    written = sum(len(files) for files in results.values())
+    logger.info(f"  Total: {written}/{total} file(s)")
+    logger.info("=" * 50)
+
+def run_batch(entries: Dict[str, int], seed: Optional[int] = None) -> Dict[str, List[str]]:
+    """Generate files for many users in one process.
+
+    Configs are fetched in a single API call, every voice is refreshed and
+    preloaded once, and all renders share one scheduler so the whole roster
+    is spread across the available cores. With `seed`, the users' files take
+    consecutive seeds in manifest order. Returns {username: [paths]}.
+    """
+    started = time.time()
+    usernames = list(entries)
+    configs = resolve_user_configs(usernames)
+    seeds: Dict[str, Optional[int]] = {}
+    for username in usernames:
+        seeds[username] = seed
+        if seed is not None:
+            seed += entries[username]
+
+    voices = {configs[u].get("voice_type", "real_brendan666") for u in usernames}
+    for voice_type in sorted(voices):
+        refresh_clip_store(voice_type)
+
+    scheduler = create_scheduler()
+    results: Dict[str, List[str]] = {}
+    try:
+        if scheduler is not None:
+            for voice_type in sorted(voices):
+                preload_voice(voice_type)
+            for bg_noise in sorted({configs[u].get("background_noise", "none") for u in usernames}):
+                preload_noise(bg_noise)
+            futures = {}
+            for username in usernames:
+                config = configs[username]
+                futures[username] = submit_user_jobs(
+                    scheduler, username, config.get("voice_type", "real_brendan666"),
+                    config.get("background_noise", "none"), entries[username], seeds[username])
+            for username, user_futures in futures.items():
+                results[username] = collect_results(user_futures)
+        else:
+            for username in usernames:
+                config = configs[username]
+                results[username] = run_jobs_for_user(
+                    username, config.get("voice_type", "real_brendan666"),
+                    config.get("background_noise", "none"), entries[username], seed=seeds[username])
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown()
+
+    log_batch_summary(results, entries, time.time() - started)
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate voice audio files for a user")
+    parser.add_argument("username", nargs="?", help="Username to generate audio for")
+    parser.add_argument("count", nargs="?", type=int, default=1, help="Number of files to generate")
+    parser.add_argument("--worker", action="store_true", help="Serve JSON jobs from stdin instead")
+    parser.add_argument("--manifest", type=Path,
+                        help="Batch of users: JSON {user: count} / list, or text lines 'user [count]'")
+    parser.add_argument("--seed", type=int,
+                        help="Base seed: files get seed, seed+1, ... (a file's seed is stored in its comment tag)")
+    args = parser.parse_args()
+    if not (args.worker or args.manifest) and not args.username:
+        parser.error("username is required unless --worker or --manifest is given")
+    return args
 
 def main():
     """Main entry point."""
-    if len(sys.argv) < 2:
-        logger.error("Usage: python audio_generator_improved.py <username> [count]")
-        logger.error("Example: python audio_generator_improved.py john123 3")
-        sys.exit(1)
+    args = parse_args()
+    if args.worker:
+        run_worker()
+        return
+    if args.manifest:
+        entries = load_manifest(args.manifest)
+        results = run_batch(entries, args.seed)
+        sys.exit(0 if all(len(results[u]) == n for u, n in entries.items()) else 1)
     
-    username = sys.argv[1]
-    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    username = args.username
+    count = args.count
     
-    logger.info(f"="*50)
+    logger.info("=" * 50)
     logger.info(f"Audio Generator - User: {username}")
-    logger.info(f"="*50)
-    
-    # Try to fetch config from API
-    config = fetch_user_config(username)
+    logger.info("=" * 50)
     
-    if not config:
-        logger.warning("Falling back to profiles.json")
-        profiles = load_profiles()
-        config = profiles.get(username, {
-            "voice_type": "real_brendan666",
-            "background_noise": "none"
-        })
+    config = resolve_user_config(username)
     
     voice_type = config.get("voice_type", "real_brendan666")
     bg_noise = config.get("background_noise", "none")
     
-    logger.info(f"Configuration:")
+    logger.info("Configuration:")
     logger.info(f"  • Voice Type: {voice_type}")
     logger.info(f"  • Background Noise: {bg_noise}")
     logger.info(f"  • Files to Generate: {count}")
-    logger.info(f"="*50)
+    if args.seed is not None:
+        logger.info(f"  • Seed: {args.seed}")
+    logger.info("=" * 50)
+    
+    refresh_clip_store(voice_type)
     
-    run_jobs_for_user(username, voice_type, bg_noise, count)
+    if count > 1 and MAX_WORKERS != 1:
+        preload_voice(voice_type)
+        preload_noise(bg_noise)
+        with create_scheduler() as scheduler:
+            run_jobs_for_user(username, voice_type, bg_noise, count, scheduler, args.seed)
+    else:
+        run_jobs_for_user(username, voice_type, bg_noise, count, seed=args.seed)
     
-    logger.info(f"="*50)
+    logger.info("=" * 50)
     logger.info(f"✓ Generation complete for {username}")
-    logger.info(f"="*50)
+    logger.info("=" * 50)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
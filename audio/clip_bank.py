@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Shared-memory clip bank: clips decoded once in the parent, read as zero-copy views by every worker."""
+import logging
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ITEM_SIZE = np.dtype(np.float32).itemsize
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: pool workers share the parent's resource tracker, so the
+        # extra registration is harmless and the owner's unlink() clears it
+        return shared_memory.SharedMemory(name=name)
+
+
+class ClipBank:
+    """Read-only float32 clips packed into one shared memory block."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, offsets: Dict[str, Tuple[int, int]],
+                 sample_rate: int, preemphasis: Optional[float], owner: bool):
+        self.sample_rate = sample_rate
+        self.preemphasis = preemphasis
+        self._shm = shm
+        self._offsets = offsets
+        self._owner = owner
+        self._data = np.ndarray((shm.size // ITEM_SIZE,), dtype=np.float32, buffer=shm.buf)
+        self._data.flags.writeable = False
+
+    @classmethod
+    def build(cls, paths: Iterable[Union[str, Path]], load_clip: Callable[[str], np.ndarray],
+              sample_rate: int, preemphasis: Optional[float] = None,
+              clip_length: Optional[Callable[[str], int]] = None) -> "ClipBank":
+        """Load every clip once with `load_clip` and pack them into shared memory.
+
+        The block is sized from `clip_length(path)` first (e.g. a ClipStore
+        index lookup; by default the clip is loaded and dropped), then each
+        clip is copied in as it loads, so only one decoded clip is held
+        outside shared memory at a time.
+        """
+        if clip_length is None:
+            def clip_length(path: str) -> int:
+                return len(load_clip(path))
+
+        lengths = {}
+        for path in dict.fromkeys(str(p) for p in paths):
+            try:
+                lengths[path] = clip_length(path)
+            except Exception as e:
+                logger.error(f"Clip bank skipped {path}: {e}")
+
+        total = sum(lengths.values())
+        shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * ITEM_SIZE)
+        data = np.ndarray((max(total, 1),), dtype=np.float32, buffer=shm.buf)
+
+        offsets = {}
+        cursor = 0
+        try:
+            for path, length in lengths.items():
+                try:
+                    clip = load_clip(path)
+                except Exception as e:
+                    logger.error(f"Clip bank skipped {path}: {e}")
+                    continue
+                if len(clip) != length:
+                    logger.error(f"Clip bank skipped {path}: {len(clip)} samples, expected {length}")
+                    continue
+                data[cursor:cursor + length] = clip
+                offsets[path] = (cursor, length)
+                cursor += length
+        except BaseException:
+            shm.unlink()  # The mapping itself goes with shm
+            raise
+        finally:
+            del data
+
+        logger.info(f"Clip bank: {len(offsets)} clips, {total * ITEM_SIZE / (1024 * 1024):.1f}MB shared")
+        return cls(shm, offsets, sample_rate, preemphasis, owner=True)
+
+    def __getstate__(self):
+        return {
+            "name": self._shm.name,
+            "offsets": self._offsets,
+            "sample_rate": self.sample_rate,
+            "preemphasis": self.preemphasis,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(_attach(state["name"]), state["offsets"], state["sample_rate"],
+                      state["preemphasis"], owner=False)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, path: Union[str, Path]) -> bool:
+        return str(path) in self._offsets
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def matches(self, sr: int, preemphasis: Optional[float]) -> bool:
+        return sr == self.sample_rate and preemphasis == self.preemphasis
+
+    def get(self, path: Union[str, Path]) -> Optional[np.ndarray]:
+        """Zero-copy read-only view of a clip, or None if it isn't in the bank."""
+        entry = self._offsets.get(str(path))
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._data[offset:offset + length]
+
+    def close(self) -> None:
+        """Detach; the owner also frees the block."""
+        self._data = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # Views still alive in this process; the mapping goes with them
+        if self._owner:
+            self._shm.unlink()
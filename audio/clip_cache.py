@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Per-process LRU cache of decoded, mic_color'd voice clips, backed by a ClipStore and/or ClipBank when attached."""
+import os
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple, Union
+
+import numpy as np
+import librosa
+
+from effects import EffectChain
+
+if TYPE_CHECKING:
+    from clip_bank import ClipBank
+    from clip_store import ClipStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB ~ 1.5h of 24kHz float32 audio
+
+CacheKey = Tuple[str, int, int, Optional[float]]
+
+
+class ClipCache:
+    """LRU cache of processed clips bounded by total array bytes."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, store: Optional["ClipStore"] = None):
+        self.max_bytes = max_bytes
+        self.store = store
+        self.bank: Optional["ClipBank"] = None
+        self._effects = EffectChain()
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, path: Union[str, Path], sr: int, preemphasis: Optional[float] = None) -> np.ndarray:
+        """Return the decoded clip at `sr`, pre-emphasised with `preemphasis` if given.
+
+        The returned array is shared between callers and marked read-only;
+        copy it before modifying in place.
+        """
+        path = str(path)
+        if self.bank is not None and self.bank.matches(sr, preemphasis):
+            audio = self.bank.get(path)
+            if audio is not None:
+                self.hits += 1
+                return audio
+
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, sr, preemphasis)
+
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return audio
+
+        self.misses += 1
+        audio = self._decode(path, sr, preemphasis, st)
+        self._insert(key, audio)
+        return audio
+
+    def load(self, path: Union[str, Path], sr: int, preemphasis: Optional[float] = None) -> np.ndarray:
+        """Like get(), but a miss is decoded without entering the LRU (for one-off copies)."""
+        path = str(path)
+        if self.bank is not None and self.bank.matches(sr, preemphasis):
+            audio = self.bank.get(path)
+            if audio is not None:
+                return audio
+
+        st = os.stat(path)
+        audio = self._entries.get((path, st.st_mtime_ns, sr, preemphasis))
+        if audio is not None:
+            return audio
+        return self._decode(path, sr, preemphasis, st)
+
+    def length(self, path: Union[str, Path], sr: int, preemphasis: Optional[float] = None) -> int:
+        """Decoded length of a clip in samples, from the store index when possible.
+
+        Pass the same `preemphasis` as the later get() so a fallback decode
+        warms the entry that rendering will use.
+        """
+        if self.bank is not None and self.bank.matches(sr, preemphasis) and path in self.bank:
+            return len(self.bank.get(path))
+        if self.store is not None:
+            samples = self.store.samples(path, sr)
+            if samples is not None:
+                return samples
+        return len(self.get(path, sr, preemphasis))
+
+    def preload(self, paths: Iterable[Union[str, Path]], sr: int, preemphasis: Optional[float] = None) -> int:
+        """Warm the cache with `paths` until the byte budget is full. Returns clips loaded.
+
+        Useful before forking workers so they share the decoded clips.
+        """
+        loaded = 0
+        for path in paths:
+            if self._bytes >= self.max_bytes:
+                break
+            self.get(path, sr, preemphasis)
+            loaded += 1
+        return loaded
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _decode(self, path: str, sr: int, preemphasis: Optional[float], st: os.stat_result) -> np.ndarray:
+        if self.store is not None and preemphasis is not None:
+            # Pre-filtered variant: no decode and no filtering at all
+            audio = self.store.load(path, sr, st, preemphasis=preemphasis)
+            if audio is not None:
+                return np.ascontiguousarray(audio, dtype=np.float32)
+
+        audio = self.store.load(path, sr, st) if self.store is not None else None
+        if audio is None:
+            audio, _ = librosa.load(path, sr=sr)
+        if preemphasis is not None:
+            # Store memmaps are read-only; librosa output is ours to modify
+            audio = np.array(audio, dtype=np.float32, copy=None if audio.flags.writeable else True)
+            self._effects.preemphasis(audio, preemphasis)
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        audio.setflags(write=False)
+        return audio
+
+    def _insert(self, key: CacheKey, audio: np.ndarray) -> None:
+        if audio.nbytes > self.max_bytes:
+            return  # Larger than the whole budget, serve it uncached
+
+        self._entries[key] = audio
+        self._bytes += audio.nbytes
+
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
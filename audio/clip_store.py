@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Persistent pre-decoded clip store: agent_voices profiles as memory-mappable float32 files per sample rate.
+
+Usage:
+    python clip_store.py                      # all profiles at 24kHz
+    python clip_store.py real_brendan666 ai_kael --sr 8000 --preemphasis 0.93
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+import librosa
+
+from effects import EffectChain
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent.resolve()
+VOICES_DIR = BASE_DIR / "agent_voices" / "profile"
+STORE_DIR = BASE_DIR / "agent_voices" / "store"
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.ogg', '.flac'}
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+DEFAULT_SAMPLE_RATE = 24000
+
+
+def variant_key(preemphasis: float) -> str:
+    """Index key / file tag for a pre-emphasis coefficient."""
+    return f"pe{preemphasis:g}"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ClipStore:
+    """Read side of the store: maps source clip paths to memory-mapped arrays."""
+
+    def __init__(self, voices_dir: Union[str, Path] = VOICES_DIR, store_dir: Union[str, Path] = STORE_DIR):
+        self.voices_dir = Path(voices_dir).resolve()
+        self.store_dir = Path(store_dir)
+        self._indexes: Dict[Tuple[str, int], Dict[str, dict]] = {}
+
+    def profile_dir(self, voice_type: str, sr: int) -> Path:
+        return self.store_dir / voice_type / str(sr)
+
+    def index(self, voice_type: str, sr: int) -> Dict[str, dict]:
+        """Return the clip index for a profile (empty if it was never built)."""
+        key = (voice_type, sr)
+        if key not in self._indexes:
+            self._indexes[key] = self._read_index(self.profile_dir(voice_type, sr), sr)
+        return self._indexes[key]
+
+    def _entry(self, source: Union[str, Path], sr: int, st: Optional[os.stat_result]) -> Optional[Tuple[str, dict]]:
+        """(voice_type, index entry) for `source` if the store has an up-to-date copy."""
+        try:
+            rel = Path(source).resolve().relative_to(self.voices_dir)
+        except ValueError:
+            return None
+        if len(rel.parts) < 2:
+            return None
+
+        voice_type, clip_key = rel.parts[0], Path(*rel.parts[1:]).as_posix()
+        entry = self.index(voice_type, sr).get(clip_key)
+        if entry is None:
+            return None
+
+        st = st or os.stat(source)
+        if entry["mtime_ns"] != st.st_mtime_ns or entry["size"] != st.st_size:
+            return None
+        return voice_type, entry
+
+    def samples(self, source: Union[str, Path], sr: int, st: Optional[os.stat_result] = None) -> Optional[int]:
+        """Decoded length of `source` from the index, or None if missing/stale."""
+        found = self._entry(source, sr, st)
+        return found[1]["samples"] if found else None
+
+    def load(self, source: Union[str, Path], sr: int, st: Optional[os.stat_result] = None,
+             preemphasis: Optional[float] = None) -> Optional[np.ndarray]:
+        """Memory-map the stored copy of `source`, or None if missing/stale.
+
+        With `preemphasis`, only a stored variant filtered with that
+        coefficient is returned.
+        """
+        found = self._entry(source, sr, st)
+        if found is None:
+            return None
+
+        voice_type, entry = found
+        data_file = entry["file"]
+        if preemphasis is not None:
+            data_file = entry.get("variants", {}).get(variant_key(preemphasis))
+            if data_file is None:
+                return None
+        if entry["samples"] == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        data_path = self.profile_dir(voice_type, sr) / data_file
+        try:
+            return np.memmap(data_path, dtype="<f4", mode="r", shape=(entry["samples"],))
+        except (OSError, ValueError):
+            return None
+
+    def build(self, voice_type: str, sr: int = DEFAULT_SAMPLE_RATE,
+              preemphasis: Iterable[float] = ()) -> Tuple[int, int]:
+        """Bring a profile's store up to date. Returns (decoded, removed) clip counts.
+
+        Every clip also gets a pre-filtered variant for each coefficient in
+        `preemphasis`; variants from earlier builds are kept.
+        """
+        voice_dir = self.voices_dir / voice_type
+        out_dir = self.profile_dir(voice_type, sr)
+        if not voice_dir.is_dir():
+            logger.warning(f"Voice profile not found: {voice_dir}")
+            return 0, 0
+
+        old_index = self._read_index(out_dir, sr)
+        new_index: Dict[str, dict] = {}
+        coefs = sorted(set(preemphasis))
+        effects = EffectChain()
+        decoded = 0
+        filtered = 0
+
+        for category in sorted(p for p in voice_dir.iterdir() if p.is_dir()):
+            for src in sorted(category.iterdir()):
+                if src.suffix.lower() not in AUDIO_EXTENSIONS:
+                    continue
+
+                clip_key = f"{category.name}/{src.name}"
+                st = src.stat()
+                entry = old_index.get(clip_key)
+                audio = None
+                if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size \
+                        and (out_dir / entry["file"]).exists():
+                    entry = dict(entry)
+                    entry["variants"] = {k: f for k, f in entry.get("variants", {}).items()
+                                         if (out_dir / f).exists()}
+                else:
+                    try:
+                        audio, _ = librosa.load(str(src), sr=sr)
+                    except Exception as e:
+                        logger.error(f"Decode error {src}: {e}")
+                        continue
+
+                    data_file = f"{category.name}/{src.name}.f32"
+                    (out_dir / category.name).mkdir(parents=True, exist_ok=True)
+                    _write_atomic(out_dir / data_file, np.ascontiguousarray(audio, dtype="<f4").tobytes())
+                    entry = {
+                        "file": data_file,
+                        "samples": int(len(audio)),
+                        "mtime_ns": st.st_mtime_ns,
+                        "size": st.st_size,
+                        "variants": {},
+                    }
+                    decoded += 1
+
+                for coef in coefs:
+                    key = variant_key(coef)
+                    if key in entry["variants"]:
+                        continue
+                    if audio is None:
+                        audio = np.fromfile(out_dir / entry["file"], dtype="<f4")
+                    variant = effects.preemphasis(np.array(audio, dtype=np.float32), coef)
+                    variant_file = f"{category.name}/{src.name}.{key}.f32"
+                    _write_atomic(out_dir / variant_file, variant.astype("<f4", copy=False).tobytes())
+                    entry["variants"][key] = variant_file
+                    filtered += 1
+
+                new_index[clip_key] = entry
+
+        removed = 0
+        for clip_key, entry in old_index.items():
+            kept = new_index.get(clip_key, {}).get("variants", {}).values()
+            for variant_file in entry.get("variants", {}).values():
+                if variant_file not in kept:
+                    (out_dir / variant_file).unlink(missing_ok=True)
+            if clip_key not in new_index:
+                (out_dir / entry["file"]).unlink(missing_ok=True)
+                removed += 1
+
+        if filtered:
+            logger.info(f"{voice_type} @ {sr}Hz: {filtered} mic_color variant(s) written")
+
+        if new_index != old_index or not (out_dir / INDEX_NAME).exists():
+            out_dir.mkdir(parents=True, exist_ok=True)
+            payload = {"version": INDEX_VERSION, "sample_rate": sr, "clips": new_index}
+            _write_atomic(out_dir / INDEX_NAME, json.dumps(payload, indent=1).encode("utf-8"))
+
+        self._indexes[(voice_type, sr)] = new_index
+        return decoded, removed
+
+    @staticmethod
+    def _read_index(out_dir: Path, sr: int) -> Dict[str, dict]:
+        index_path = out_dir / INDEX_NAME
+        if not index_path.exists():
+            return {}
+        try:
+            with open(index_path, "r") as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable clip index {index_path}: {e}")
+            return {}
+        if payload.get("version") != INDEX_VERSION or payload.get("sample_rate") != sr:
+            return {}
+        return payload.get("clips", {})
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s', datefmt='%H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Pre-decode agent_voices profiles into the clip store")
+    parser.add_argument("voice_types", nargs="*", help="Profiles to build (default: all)")
+    parser.add_argument("--sr", type=int, default=DEFAULT_SAMPLE_RATE, help="Target sample rate")
+    parser.add_argument("--preemphasis", type=float, nargs="*", default=[],
+                        help="Also store mic_color variants for these coefficients")
+    args = parser.parse_args()
+
+    store = ClipStore()
+    voice_types = args.voice_types or sorted(p.name for p in VOICES_DIR.iterdir() if p.is_dir())
+    if not voice_types:
+        logger.error(f"No voice profiles found in {VOICES_DIR}")
+        sys.exit(1)
+
+    for voice_type in voice_types:
+        decoded, removed = store.build(voice_type, args.sr, args.preemphasis)
+        total = len(store.index(voice_type, args.sr))
+        logger.info(f"{voice_type} @ {args.sr}Hz: {total} clips ({decoded} decoded, {removed} removed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Batched, cached account config lookups against the server's /api/accounts endpoint."""
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    "voice_type": "real_brendan666",
+    "background_noise": "none"
+}
+
+
+def account_to_config(account: Dict[str, Any], username: str) -> Dict[str, Any]:
+    """Generator config from an /api/accounts account document."""
+    return {
+        "voice_type": account.get("voiceType", "real_brendan666"),
+        "background_noise": account.get("backgroundNoise", "none"),
+        "player_type": account.get("playerType", "player"),
+        "discord_name": account.get("discordName", username)
+    }
+
+
+def _valid_entry(entry: Any) -> bool:
+    """Whether a cache entry has the {"config": {...}, "fetched_at": seconds} shape."""
+    return (isinstance(entry, dict) and isinstance(entry.get("config"), dict)
+            and isinstance(entry.get("fetched_at"), (int, float)))
+
+
+class ConfigClient:
+    """Batched, cached account config lookups with profiles.json fallback."""
+
+    def __init__(self, base_url: str, timeout: float = 10, cache_path: Optional[Union[str, Path]] = None,
+                 ttl: float = 3600, profiles_file: Optional[Union[str, Path]] = None,
+                 batch_size: int = 100, session: Optional[requests.Session] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.ttl = ttl
+        self.profiles_file = Path(profiles_file) if profiles_file else None
+        self.batch_size = max(int(batch_size), 1)
+        self._session = session
+        self._cache: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @property
+    def session(self) -> requests.Session:
+        # Created lazily so forked workers don't share a parent's sockets by accident
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers["Content-Type"] = "application/json"
+        return self._session
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    # ----- disk cache -----
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_path and self.cache_path.exists():
+                try:
+                    with open(self.cache_path, "r") as f:
+                        cache = json.load(f)
+                    if not isinstance(cache, dict):
+                        raise ValueError("not a JSON object")
+                    self._cache = cache
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable config cache {self.cache_path}: {e}")
+        return self._cache
+
+    def _save_cache(self) -> None:
+        if not self.cache_path or self._cache is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(self._cache, f)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Cannot write config cache {self.cache_path}: {e}")
+
+    def _cached(self, usernames: Iterable[str], fresh: bool) -> Dict[str, Dict[str, Any]]:
+        cache = self._load_cache()
+        now = time.time()
+        found = {}
+        for username in usernames:
+            entry = cache.get(username)
+            if not _valid_entry(entry):
+                if entry is not None:
+                    logger.warning(f"Ignoring malformed config cache entry for {username}")
+                continue
+            if not fresh or now - entry["fetched_at"] < self.ttl:
+                found[username] = entry["config"]
+        return found
+
+    def invalidate(self, usernames: Optional[Iterable[str]] = None) -> None:
+        """Drop cached entries (all of them by default)."""
+        cache = self._load_cache()
+        if usernames is None:
+            cache.clear()
+        else:
+            for username in usernames:
+                cache.pop(username, None)
+        self._save_cache()
+
+    # ----- API -----
+
+    def _post(self, usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+        response = self.session.post(
+            f"{self.base_url}/api/accounts",
+            json={"usernames": usernames},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise requests.exceptions.HTTPError(f"API error: {response.status_code}", response=response)
+
+        configs = {}
+        for account in response.json().get("accounts", []):
+            username = account.get("username")
+            if username in usernames:
+                configs[username] = account_to_config(account, username)
+        return configs
+
+    def fetch(self, usernames: Iterable[str], use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Configs known to the API (or fresh in the cache); unknown users are left out.
+
+        If the API can't be reached, expired cache entries are used instead.
+        """
+        usernames = list(dict.fromkeys(usernames))
+        configs = self._cached(usernames, fresh=True) if use_cache else {}
+        pending = [u for u in usernames if u not in configs]
+        if not pending:
+            return configs
+
+        logger.info(f"Fetching config for {len(pending)} user(s)")
+        fetched = {}
+        try:
+            for i in range(0, len(pending), self.batch_size):
+                fetched.update(self._post(pending[i:i + self.batch_size]))
+        except requests.exceptions.ConnectionError:
+            logger.error(f"Cannot connect to API at {self.base_url}")
+        except requests.exceptions.Timeout:
+            logger.error(f"API request timeout after {self.timeout}s")
+        except Exception as e:
+            logger.error(f"Error fetching config: {e}")
+        else:
+            missing = [u for u in pending if u not in fetched]
+            if missing:
+                logger.warning(f"Not found in database: {', '.join(missing)}")
+
+        if fetched:
+            now = time.time()
+            cache = self._load_cache()
+            for username, config in fetched.items():
+                cache[username] = {"config": config, "fetched_at": now}
+            self._save_cache()
+        configs.update(fetched)
+
+        stale = self._cached([u for u in pending if u not in fetched], fresh=False)
+        if stale:
+            logger.warning(f"Using expired cached config for: {', '.join(stale)}")
+            configs.update(stale)
+        return configs
+
+    # ----- fallback -----
+
+    def load_profiles(self) -> Dict[str, Any]:
+        """Load profiles from JSON file (fallback)."""
+        if self.profiles_file and self.profiles_file.exists():
+            with open(self.profiles_file, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def resolve(self, usernames: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """A config for every user: API/cache, then profiles.json, then DEFAULT_CONFIG."""
+        usernames = list(dict.fromkeys(usernames))
+        configs = self.fetch(usernames)
+
+        missing = [u for u in usernames if u not in configs]
+        if missing:
+            logger.warning(f"Falling back to profiles.json for: {', '.join(missing)}")
+            profiles = self.load_profiles()
+            for username in missing:
+                configs[username] = profiles.get(username, dict(DEFAULT_CONFIG))
+        return configs
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Turn scheduling and rendering for N-speaker conversations into one MultiTrackBuffer."""
+import logging
+import random
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from multitrack import MultiTrackBuffer
+from voice_index import VoiceIndex
+
+logger = logging.getLogger(__name__)
+
+Line = Tuple[Optional[np.ndarray], ...]
+
+
+@dataclass(frozen=True)
+class TurnSettings:
+    """Timing of the turns within an exchange (seconds / probabilities)."""
+    response_min: float = 0.5
+    response_max: float = 2.0
+    join_chance: float = 0.6        # Each other speaker with the line answers with this probability
+    overlap_chance: float = 0.0     # Answer starts before the previous turn ends
+    overlap_min: float = 0.2
+    overlap_max: float = 0.8
+    interrupt_chance: float = 0.0   # Answer cuts the previous turn short
+    interrupt_min: float = 0.4      # Fraction of the previous clip played before the cut
+    interrupt_max: float = 0.8
+    interrupt_fade: float = 0.05    # Fade-out of an interrupted clip
+
+
+@dataclass(frozen=True)
+class Turn:
+    """`length` samples of `clip` on `speaker`'s channel from frame `start`."""
+    speaker: int
+    clip: np.ndarray
+    start: int
+    length: int
+
+    @property
+    def end(self) -> int:
+        return self.start + self.length
+
+
+class LineBank:
+    """Category -> lines, each holding one processed clip per speaker who has it."""
+
+    def __init__(self, lines: Dict[str, List[Line]], speakers: int):
+        self._lines = lines
+        self.speakers = speakers
+
+    @classmethod
+    def build(cls, voices: Sequence[VoiceIndex], categories: List[str], load: Callable[[str], np.ndarray],
+              min_speakers: int = 2) -> "LineBank":
+        """Lines of `categories` that at least `min_speakers` of `voices` have.
+
+        `load(path)` processes a clip; clips that fail to load count as missing.
+        """
+        lines: Dict[str, List[Line]] = {}
+        for category in categories:
+            names = [voice.names(category) for voice in voices]
+            entries = []
+            for name in sorted(set().union(*names)):
+                clips = []
+                for clips_by_name in names:
+                    path = clips_by_name.get(name)
+                    clip = None
+                    if path is not None:
+                        try:
+                            clip = load(path)
+                            clip.setflags(write=False)
+                        except Exception as e:
+                            logger.warning(f"Skipping clip {path}: {e}")
+                    clips.append(clip)
+                if sum(clip is not None for clip in clips) >= min_speakers:
+                    entries.append(tuple(clips))
+            if entries:
+                lines[category] = entries
+        return cls(lines, len(voices))
+
+    def lines(self, category: str) -> List[Line]:
+        return self._lines.get(category, [])
+
+    def choice(self, category: str, rng: random.Random = random) -> Optional[Line]:
+        lines = self._lines.get(category)
+        return rng.choice(lines) if lines else None
+
+    def __len__(self) -> int:
+        return sum(len(lines) for lines in self._lines.values())
+
+
+class ConversationEngine:
+    """Schedules exchanges across a group and writes them into a MultiTrackBuffer."""
+
+    def __init__(self, bank: LineBank, sr: int, settings: TurnSettings = TurnSettings(), rng=random):
+        self.bank = bank
+        self.sr = sr
+        self.settings = settings
+        self.rng = rng
+        self._fades: Dict[int, np.ndarray] = {}
+
+    def schedule(self, category: str, start: int, cursors: Sequence[int]) -> List[Turn]:
+        """Turns of one exchange from frame `start` (empty if the category has no lines).
+
+        `cursors` are the speakers' current track ends; nobody's turn starts
+        before their previous one has finished.
+        """
+        line = self.bank.choice(category, self.rng)
+        if line is None:
+            return []
+        rng, settings, sr = self.rng, self.settings, self.sr
+
+        present = [speaker for speaker, clip in enumerate(line) if clip is not None]
+        leader = rng.choice(present)
+        others = [speaker for speaker in present if speaker != leader]
+        rng.shuffle(others)
+        # At least one answer, so every exchange is still a conversation
+        answering = [speaker for speaker in others if rng.random() < settings.join_chance] or others[:1]
+
+        turns = [Turn(leader, line[leader], max(start, cursors[leader]), len(line[leader]))]
+        for speaker in answering:
+            previous = turns[-1]
+            r = rng.random()
+            if r < settings.interrupt_chance:
+                begin = previous.start + int(previous.length * rng.uniform(settings.interrupt_min, settings.interrupt_max))
+                # The interrupted speaker trails off over the fade after being cut in on
+                cut = min(begin + int(settings.interrupt_fade * sr), previous.end) - previous.start
+                turns[-1] = replace(previous, length=max(cut, 0))
+            elif r < settings.interrupt_chance + settings.overlap_chance:
+                begin = previous.end - int(rng.uniform(settings.overlap_min, settings.overlap_max) * sr)
+            else:
+                begin = previous.end + int(rng.uniform(settings.response_min, settings.response_max) * sr)
+            clip = line[speaker]
+            turns.append(Turn(speaker, clip, max(begin, start, cursors[speaker]), len(clip)))
+        return turns
+
+    def _fade(self, samples: int) -> np.ndarray:
+        fade = self._fades.get(samples)
+        if fade is None:
+            fade = self._fades[samples] = np.linspace(1.0, 0.0, samples, dtype=np.float32)
+        return fade
+
+    def render(self, turns: List[Turn], buffer: MultiTrackBuffer) -> int:
+        """Write `turns` into their speakers' channels. Returns the frame after the last one ends."""
+        end = 0
+        fade_samples = int(self.settings.interrupt_fade * self.sr)
+        for turn in turns:
+            buffer.pad_to(turn.speaker, turn.start)
+            if turn.length < len(turn.clip):
+                # Interrupted: play up to the cut, fading out the last few milliseconds
+                n = min(fade_samples, turn.length)
+                buffer.write(turn.speaker, turn.clip[:turn.length - n])
+                buffer.write(turn.speaker, turn.clip[turn.length - n:turn.length] * self._fade(n))
+            else:
+                buffer.write(turn.speaker, turn.clip)
+            end = max(end, turn.end)
+        return end
+
+    def exchange(self, category: str, buffer: MultiTrackBuffer, start: int) -> Optional[int]:
+        """Schedule and render one exchange from `start`. Returns its end frame, or None."""
+        turns = self.schedule(category, start, buffer.cursors)
+        if not turns:
+            return None
+        return self.render(turns, buffer)
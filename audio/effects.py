@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Per-clip effect chain (trim, fade, gain, pre-emphasis) applied in one pass over a reused scratch buffer."""
+import random
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class EffectSettings:
+    """Randomisation ranges for per-clip effects."""
+    fade_chance: float = 0.0
+    fade_min: float = 1.0
+    fade_max: float = 1.0
+    trim_chance: float = 0.0
+    trim_min: float = 1.0
+    trim_max: float = 1.0
+    gain_db_min: float = 0.0  # Scaled by the caller's energy
+    gain_db_max: float = 0.0
+
+    def sample(self, length: int, energy: float = 1.0, rng=random) -> Tuple[int, float, float]:
+        """Draw (kept length, linear gain, fade_to) for a clip of `length` samples.
+
+        Random numbers are drawn trim, fade, gain; effects with a zero chance
+        or empty range draw nothing.
+        """
+        if self.trim_chance > 0 and rng.random() < self.trim_chance:
+            length = int(length * rng.uniform(self.trim_min, self.trim_max))
+
+        fade_to = 1.0
+        if self.fade_chance > 0 and rng.random() < self.fade_chance:
+            fade_to = rng.uniform(self.fade_min, self.fade_max)
+
+        gain = 1.0
+        if self.gain_db_min != 0.0 or self.gain_db_max != 0.0:
+            gain_db = rng.uniform(self.gain_db_min, self.gain_db_max) * energy
+            gain = 10 ** (gain_db / 20)
+
+        return length, gain, fade_to
+
+
+class EffectChain:
+    """Applies trim/fade/gain/pre-emphasis using one reusable scratch buffer."""
+
+    def __init__(self, capacity: int = 0):
+        self._scratch = np.empty(capacity, dtype=np.float32)
+        self._ramp = np.arange(capacity, dtype=np.float32)
+
+    def _buffers(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        if n > len(self._scratch):
+            capacity = max(n, int(len(self._scratch) * 1.5))
+            self._scratch = np.empty(capacity, dtype=np.float32)
+            self._ramp = np.arange(capacity, dtype=np.float32)
+        return self._scratch[:n], self._ramp[:n]
+
+    def _envelope(self, k0: int, k1: int, n: int, gain: float, fade_to: float) -> np.ndarray:
+        """Samples [k0, k1) of np.linspace(gain, gain * fade_to, n), in the scratch buffer."""
+        env, ramp = self._buffers(k1 - k0)
+        step = gain * (fade_to - 1.0) / (n - 1) if n > 1 else 0.0
+        np.add(ramp, np.float32(k0), out=env)
+        env *= np.float32(step)
+        env += np.float32(gain)
+        return env
+
+    def preemphasis(self, audio: np.ndarray, coef: float) -> np.ndarray:
+        """In-place librosa.effects.preemphasis(audio, coef=coef). Returns `audio`."""
+        if len(audio) < 2:
+            return audio
+        # librosa's default zi extrapolates linearly: y[0] = x[0] + (2 * x[0] - x[1])
+        first = audio[0] + (np.float32(2.0) * audio[0] - audio[1])
+        prev, _ = self._buffers(len(audio) - 1)
+        np.multiply(audio[:-1], np.float32(coef), out=prev)
+        audio[1:] -= prev
+        audio[0] = first
+        return audio
+
+    def apply(self, audio: np.ndarray, length: Optional[int] = None, gain: float = 1.0,
+              fade_to: float = 1.0, preemphasis: Optional[float] = None) -> np.ndarray:
+        """Trim, pre-emphasise, fade and gain a writable float32 clip in place.
+
+        Returns the trimmed view of `audio`.
+        """
+        if length is not None:
+            audio = audio[:max(int(length), 0)]
+        if preemphasis is not None:
+            self.preemphasis(audio, preemphasis)
+        n = len(audio)
+        if fade_to != 1.0:
+            audio *= self._envelope(0, n, n, gain, fade_to)
+        elif gain != 1.0:
+            audio *= np.float32(gain)
+        return audio
+
+    def mix(self, dst: np.ndarray, clip: np.ndarray, k0: int, k1: int, n: int,
+            gain: float = 1.0, fade_to: float = 1.0) -> None:
+        """Add samples [k0, k1) of an n-sample effected clip into `dst` (len k1 - k0).
+
+        `clip` is only read, so shared read-only arrays can be mixed directly.
+        """
+        src = clip[k0:k1]
+        if fade_to != 1.0:
+            env = self._envelope(k0, k1, n, gain, fade_to)
+            env *= src
+            dst += env
+        elif gain != 1.0:
+            scaled, _ = self._buffers(k1 - k0)
+            np.multiply(src, np.float32(gain), out=scaled)
+            dst += scaled
+        else:
+            dst += src
+
+    def peak(self, clip: np.ndarray, n: int, gain: float = 1.0, fade_to: float = 1.0) -> float:
+        """Peak absolute value of the first n samples of `clip` after fade and gain."""
+        if n <= 0:
+            return 0.0
+        if fade_to == 1.0:
+            return float(max(np.max(clip[:n]), -np.min(clip[:n]))) * abs(gain)
+        env = self._envelope(0, n, n, gain, fade_to)
+        env *= clip[:n]
+        np.abs(env, out=env)
+        return float(np.max(env))
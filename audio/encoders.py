@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Streaming output encoders (ffmpeg pipe, libsndfile Ogg, WAV) that write the same bytes for the same samples."""
+import os
+import zlib
+import shutil
+import logging
+from abc import ABC, abstractmethod
+import subprocess
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+STDERR_TAIL_BYTES = 4096  # How much ffmpeg stderr to keep in error messages
+OGG_SERIAL = 0x5EED  # Stream serial for libsndfile Ogg output (it only has to be unique within a file)
+
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+class EncoderError(RuntimeError):
+    """An encoder failed to produce its output file."""
+
+
+def ogg_crc(page: bytes) -> int:
+    """Ogg page checksum (CRC-32, poly 0x04C11DB7, unreflected) via zlib's reflected CRC-32."""
+    reg = zlib.crc32(page.translate(_BIT_REVERSE), 0xFFFFFFFF) ^ 0xFFFFFFFF
+    return int(f"{reg:032b}"[::-1], 2)
+
+
+def set_ogg_serial(path: Path, serial: int) -> None:
+    """Rewrite every page of a single-stream Ogg file to `serial`, updating the checksums."""
+    data = bytearray(path.read_bytes())
+    offset = 0
+    while offset < len(data):
+        if data[offset:offset + 4] != b"OggS":
+            raise EncoderError(f"{path} is not an Ogg stream (bad page at byte {offset})")
+        segments = data[offset + 26]
+        length = 27 + segments + sum(data[offset + 27:offset + 27 + segments])
+        page = memoryview(data)[offset:offset + length]
+        page[14:18] = serial.to_bytes(4, "little")
+        page[22:26] = bytes(4)
+        page[22:26] = ogg_crc(page.tobytes()).to_bytes(4, "little")
+        page.release()
+        offset += length
+    path.write_bytes(data)
+
+
+class TrackWriter(ABC):
+    """Context-managed sink for float32 blocks; removes partial output on error."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    @abstractmethod
+    def write(self, block: np.ndarray) -> None:
+        """Append one block of samples."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Finish the file; raises EncoderError if it couldn't be written."""
+
+    @abstractmethod
+    def abort(self) -> None:
+        """Stop writing and remove the partial file."""
+
+    def __enter__(self) -> "TrackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class SoundFileWriter(TrackWriter):
+    def __init__(self, path: Path, sample_rate: int, channels: int, format: str, subtype: str,
+                 compression_level: Optional[float] = None, metadata: Optional[Dict[str, str]] = None):
+        super().__init__(path)
+        kwargs = {} if compression_level is None else {"compression_level": compression_level}
+        try:
+            self._file = sf.SoundFile(str(path), 'w', sample_rate, channels, format=format, subtype=subtype, **kwargs)
+        except (sf.LibsndfileError, RuntimeError, TypeError) as e:
+            raise EncoderError(f"libsndfile cannot write {format}/{subtype}: {e}") from e
+        for key, value in (metadata or {}).items():
+            setattr(self._file, key, value)
+        self._ogg = format == "OGG"
+
+    def write(self, block: np.ndarray) -> None:
+        self._file.write(block)
+
+    def close(self) -> None:
+        self._file.close()
+        if self._ogg:
+            # libsndfile draws a random stream serial; a fixed one makes the bytes reproducible
+            set_ogg_serial(self.path, OGG_SERIAL)
+
+    def abort(self) -> None:
+        self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+class FfmpegPipeWriter(TrackWriter):
+    def __init__(self, path: Path, cmd: List[str], sample_format: str):
+        super().__init__(path)
+        self.sample_format = sample_format
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+        except OSError as e:
+            self._stderr.close()
+            raise EncoderError(f"Cannot start ffmpeg: {e}") from e
+
+    def write(self, block: np.ndarray) -> None:
+        if self.sample_format == "s16le":
+            data = (np.clip(block, -1.0, 1.0) * 32767.0).astype("<i2")
+        else:
+            data = np.ascontiguousarray(block, dtype="<f4")
+        try:
+            self._proc.stdin.write(data.tobytes())
+        except BrokenPipeError:
+            # ffmpeg died early; close() reports why
+            self.close()
+
+    def close(self) -> None:
+        if self._proc.stdin and not self._proc.stdin.closed:
+            try:
+                self._proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = self._proc.wait()
+        stderr = self._read_stderr()
+        if returncode != 0:
+            self.path.unlink(missing_ok=True)
+            raise EncoderError(f"ffmpeg exited with {returncode}: {stderr or 'no output'}")
+        if stderr:
+            logger.debug(f"ffmpeg: {stderr}")
+
+    def abort(self) -> None:
+        self._proc.kill()
+        self._proc.wait()
+        self._read_stderr()
+        self.path.unlink(missing_ok=True)
+
+    def _read_stderr(self) -> str:
+        if self._stderr.closed:
+            return ""
+        self._stderr.seek(0, os.SEEK_END)
+        size = self._stderr.tell()
+        self._stderr.seek(max(size - STDERR_TAIL_BYTES, 0))
+        text = self._stderr.read().decode("utf-8", errors="replace").strip()
+        self._stderr.close()
+        return text
+
+
+class WavEncoder:
+    """PCM_16 WAV via libsndfile."""
+    name = "wav"
+    extension = ".wav"
+
+    def open(self, path: Union[str, Path], sample_rate: int, channels: int = 1,
+             metadata: Optional[Dict[str, str]] = None) -> TrackWriter:
+        return SoundFileWriter(Path(path), sample_rate, channels, "WAV", "PCM_16", metadata=metadata)
+
+
+class SoundFileEncoder:
+    """OGG/Opus or OGG/Vorbis encoded in-process by libsndfile."""
+    extension = ".ogg"
+
+    def __init__(self, subtype: str = "OPUS", compression_level: Optional[float] = None):
+        self.subtype = subtype
+        self.compression_level = compression_level
+        self.name = f"soundfile-{subtype.lower()}"
+
+    def open(self, path: Union[str, Path], sample_rate: int, channels: int = 1,
+             metadata: Optional[Dict[str, str]] = None) -> TrackWriter:
+        return SoundFileWriter(Path(path), sample_rate, channels, "OGG", self.subtype, self.compression_level, metadata)
+
+
+class FfmpegPipeEncoder:
+    """Raw PCM piped into ffmpeg's stdin (OGG/Opus by default)."""
+
+    def __init__(self, ffmpeg: str = "ffmpeg", codec: str = "libopus", bitrate: str = "48k",
+                 extension: str = ".ogg", sample_format: str = "f32le"):
+        self.ffmpeg = ffmpeg
+        self.codec = codec
+        self.bitrate = bitrate
+        self.extension = extension
+        self.sample_format = sample_format
+        self.name = f"ffmpeg-{codec}"
+
+    def command(self, path: Path, sample_rate: int, channels: int,
+                metadata: Optional[Dict[str, str]] = None) -> List[str]:
+        tags = [arg for key, value in (metadata or {}).items() for arg in ('-metadata', f'{key}={value}')]
+        return [
+            self.ffmpeg, '-hide_banner', '-nostats', '-loglevel', 'error',
+            '-f', self.sample_format, '-ar', str(sample_rate), '-ac', str(channels), '-i', 'pipe:0',
+            # bitexact: fixed Ogg serial numbers and no version tags, so equal input gives equal bytes
+            '-c:a', self.codec, '-b:a', self.bitrate, '-fflags', '+bitexact', '-flags:a', '+bitexact',
+            *tags, str(path), '-y',
+        ]
+
+    def open(self, path: Union[str, Path], sample_rate: int, channels: int = 1,
+             metadata: Optional[Dict[str, str]] = None) -> TrackWriter:
+        path = Path(path)
+        return FfmpegPipeWriter(path, self.command(path, sample_rate, channels, metadata), self.sample_format)
+
+
+DEFAULT_PREFERENCE = ("soundfile-opus", "ffmpeg-libopus", "soundfile-vorbis", "wav")
+PROBE_SECONDS = 0.25
+
+
+def _candidate(name: str, bitrate: str, compression_level: Optional[float]):
+    if name == "soundfile-opus":
+        return SoundFileEncoder("OPUS", compression_level)
+    if name == "soundfile-vorbis":
+        return SoundFileEncoder("VORBIS", compression_level)
+    if name == "ffmpeg-libopus":
+        ffmpeg = shutil.which("ffmpeg")
+        return FfmpegPipeEncoder(ffmpeg, bitrate=bitrate) if ffmpeg else None
+    if name == "wav":
+        return WavEncoder()
+    raise ValueError(f"Unknown encoder: {name}")
+
+
+def probe_encoder(encoder, sample_rate: int) -> bool:
+    """Encode a short block of silence to check the encoder works at `sample_rate`."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"probe{encoder.extension}"
+        try:
+            with encoder.open(path, sample_rate) as writer:
+                writer.write(np.zeros(int(sample_rate * PROBE_SECONDS), dtype=np.float32))
+            return path.exists() and path.stat().st_size > 0
+        except (EncoderError, OSError) as e:
+            logger.debug(f"{encoder.name} unavailable: {e}")
+            return False
+
+
+@lru_cache(maxsize=None)
+def select_encoder(sample_rate: int, bitrate: str = "48k", compression_level: Optional[float] = None,
+                   preference: Sequence[str] = DEFAULT_PREFERENCE):
+    """First encoder in `preference` that works here, probed once per process.
+
+    `bitrate` applies to ffmpeg, `compression_level` (0.0-1.0) to libsndfile.
+    """
+    for name in preference:
+        encoder = _candidate(name, bitrate, compression_level)
+        if encoder is not None and probe_encoder(encoder, sample_rate):
+            logger.info(f"Output encoder: {encoder.name}")
+            return encoder
+        logger.debug(f"Skipping encoder {name}")
+    logger.warning("No working OGG encoder found, writing WAV output")
+    return WavEncoder()
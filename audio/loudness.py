@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Peak and integrated-loudness (BS.1770) meters fed block by block, and a lookahead true-peak limiter."""
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import minimum_filter1d, uniform_filter1d
+from scipy.signal import firwin, sosfilt
+
+HOP_SECONDS = 0.1           # Gating block step (75% overlap of 400 ms)
+HOPS_PER_BLOCK = 4          # 400 ms gating block
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+OVERSAMPLE = 8              # True-peak interpolation factor
+INTERP_TAPS = 193           # Odd length: delay is exactly (taps - 1) / 2 upsampled samples
+INTERP_WINDOW = ("kaiser", 8.0)  # Shorter/looser filters miss peaks of content near Nyquist
+TRUE_PEAK_MARGIN_DB = 0.3   # Covers estimator error and peaks built up by gain changes between samples
+
+
+class PeakMeter:
+    """Running absolute peak over a stream of blocks."""
+
+    def __init__(self):
+        self.peak = 0.0
+
+    def update(self, block: np.ndarray) -> np.ndarray:
+        """Fold `block` into the peak. Returns `block` for chaining."""
+        if len(block):
+            self.peak = max(self.peak, float(np.max(block)), float(-np.min(block)))
+        return block
+
+    def gain(self, target: float) -> float:
+        """Scalar that brings the measured peak to `target` (1.0 for silence)."""
+        return target / self.peak if self.peak > 0 else 1.0
+
+
+def k_weighting(sr: int) -> np.ndarray:
+    """BS.1770 K-weighting (high shelf + high pass) as second-order sections for `sr`."""
+    # High shelf: +4 dB above ~1.5 kHz
+    gain_db, q, fc = 4.0, 1 / np.sqrt(2), 1500.0
+    a = 10 ** (gain_db / 40)
+    w0 = 2 * np.pi * fc / sr
+    alpha = np.sin(w0) / (2 * q)
+    cos = np.cos(w0)
+    shelf = [
+        a * ((a + 1) + (a - 1) * cos + 2 * np.sqrt(a) * alpha),
+        -2 * a * ((a - 1) + (a + 1) * cos),
+        a * ((a + 1) + (a - 1) * cos - 2 * np.sqrt(a) * alpha),
+        (a + 1) - (a - 1) * cos + 2 * np.sqrt(a) * alpha,
+        2 * ((a - 1) - (a + 1) * cos),
+        (a + 1) - (a - 1) * cos - 2 * np.sqrt(a) * alpha,
+    ]
+    # High pass at ~38 Hz
+    q, fc = 0.5, 38.0
+    w0 = 2 * np.pi * fc / sr
+    alpha = np.sin(w0) / (2 * q)
+    cos = np.cos(w0)
+    highpass = [(1 + cos) / 2, -(1 + cos), (1 + cos) / 2, 1 + alpha, -2 * cos, 1 - alpha]
+
+    sos = np.array([shelf, highpass], dtype=np.float64)
+    sos[:, :3] /= sos[:, 3:4]
+    sos[:, 3:] /= sos[:, 3:4]
+    return sos
+
+
+class LoudnessMeter:
+    """Integrated loudness (LUFS) of a mono stream, measured block by block."""
+
+    def __init__(self, sr: int):
+        self.sr = sr
+        self._sos = k_weighting(sr)
+        self._zi = np.zeros((self._sos.shape[0], 2))
+        self._hop = max(int(round(HOP_SECONDS * sr)), 1)
+        self._hops = []          # Mean square of each complete 100 ms hop
+        self._partial_sum = 0.0
+        self._partial_n = 0
+
+    def update(self, block: np.ndarray) -> np.ndarray:
+        """K-weight `block` and accumulate it. Returns `block` for chaining."""
+        if not len(block):
+            return block
+        weighted, self._zi = sosfilt(self._sos, block, zi=self._zi)
+        weighted *= weighted
+        hop = self._hop
+
+        i = 0
+        if self._partial_n:
+            take = min(hop - self._partial_n, len(weighted))
+            self._partial_sum += float(weighted[:take].sum())
+            self._partial_n += take
+            i = take
+            if self._partial_n == hop:
+                self._hops.append(self._partial_sum / hop)
+                self._partial_sum, self._partial_n = 0.0, 0
+
+        full = (len(weighted) - i) // hop
+        if full:
+            self._hops.extend(weighted[i:i + full * hop].reshape(full, hop).mean(axis=1).tolist())
+            i += full * hop
+
+        if i < len(weighted):
+            self._partial_sum += float(weighted[i:].sum())
+            self._partial_n += len(weighted) - i
+        return block
+
+    def integrated(self) -> float:
+        """Gated integrated loudness in LUFS (-inf for silence or very short input)."""
+        hops = np.asarray(self._hops)
+        if len(hops) < HOPS_PER_BLOCK:
+            return float("-inf")
+        blocks = np.convolve(hops, np.full(HOPS_PER_BLOCK, 1 / HOPS_PER_BLOCK), mode="valid")
+        with np.errstate(divide="ignore"):
+            levels = -0.691 + 10 * np.log10(blocks)
+
+        gated = blocks[levels > ABSOLUTE_GATE_LUFS]
+        if not len(gated):
+            return float("-inf")
+        threshold = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE_LU
+        gated = blocks[(levels > ABSOLUTE_GATE_LUFS) & (levels > threshold)]
+        return float(-0.691 + 10 * np.log10(gated.mean()))
+
+    def gain(self, target_lufs: float, max_gain_db: float = 30.0) -> float:
+        """Linear gain that brings the measured loudness to `target_lufs`."""
+        loudness = self.integrated()
+        if not np.isfinite(loudness):
+            return 1.0
+        return 10 ** (min(target_lufs - loudness, max_gain_db) / 20)
+
+
+class TruePeakLimiter:
+    """Lookahead limiter holding a stream under a true-peak ceiling."""
+
+    def __init__(self, sr: int, ceiling_db: float = -1.0, lookahead_seconds: float = 0.005,
+                 margin_db: float = TRUE_PEAK_MARGIN_DB):
+        # Samples are limited to `margin_db` under the ceiling so the true peak stays under it
+        self.ceiling = 10 ** ((ceiling_db - margin_db) / 20)
+        self.window = max(int(lookahead_seconds * sr), 1)
+
+        taps = firwin(INTERP_TAPS, 1.0 / OVERSAMPLE, window=INTERP_WINDOW) * OVERSAMPLE
+        # One column per phase, rows oldest input first, so all phases are one matrix product
+        span = -(-INTERP_TAPS // OVERSAMPLE)
+        self._phases = np.zeros((span, OVERSAMPLE))
+        for p in range(OVERSAMPLE):
+            h = taps[p::OVERSAMPLE]
+            self._phases[span - len(h):, p] = h[::-1]
+        self._history = np.zeros(span - 1)  # Input samples the next block's filters still reach back to
+        self._last_env = 0.0
+        # Interpolated sample n of every phase lies around input sample n - interp_delay
+        interp_delay = (INTERP_TAPS - 1) // (2 * OVERSAMPLE)
+
+        self.delay = self.window - 1 + interp_delay
+        self._pending = np.zeros(0)                  # Input samples not yet output
+        self._required = np.ones(self.window - 1)    # History of per-sample required gain
+        self._smoothed = np.ones(self.window - 1)    # History of lookahead minimum
+        self.min_gain = 1.0
+
+    def _envelope(self, x: np.ndarray) -> np.ndarray:
+        """Largest |interpolated sample| on either side of each input sample (true-peak estimate)."""
+        if not len(x):
+            return np.zeros(0)
+        u = np.concatenate([self._history, x])
+        self._history = u[len(x):]
+        env = np.abs(sliding_window_view(u, len(self._phases)) @ self._phases).max(axis=1)
+        # Each phase pass covers the interval after a sample; fold in the one before it too
+        last, self._last_env = self._last_env, float(env[-1])
+        env[1:] = np.maximum(env[1:], env[:-1])
+        env[0] = max(env[0], last)
+        return env
+
+    def _gains(self, x: np.ndarray) -> np.ndarray:
+        env = self._envelope(x)
+        required = np.ones(len(x))
+        over = env > self.ceiling
+        required[over] = self.ceiling / env[over]
+
+        w = self.window
+        r = np.concatenate([self._required, required])
+        m = minimum_filter1d(r, w, origin=(w - 1) // 2, mode="nearest")[w - 1:]
+        self._required = r[len(r) - (w - 1):] if w > 1 else r[:0]
+
+        mm = np.concatenate([self._smoothed, m])
+        s = uniform_filter1d(mm, w, origin=(w - 1) // 2, mode="nearest")[w - 1:]
+        self._smoothed = mm[len(mm) - (w - 1):] if w > 1 else mm[:0]
+        # The average of w values each <= every required gain they cover can't exceed them
+        return np.minimum(s, m)
+
+    def process(self, block: np.ndarray, gain: float = 1.0) -> np.ndarray:
+        """Apply `gain` and limit. Returns the output samples that are ready (float32)."""
+        x = np.asarray(block, dtype=np.float64) * gain
+        gains = self._gains(x)
+        if len(gains):
+            self.min_gain = min(self.min_gain, float(gains.min()))
+
+        pending = np.concatenate([self._pending, x])
+        ready = max(len(pending) - self.delay, 0)
+        out = pending[:ready] * gains[len(gains) - ready:]
+        self._pending = pending[ready:]
+        return out.astype(np.float32)
+
+    def flush(self) -> np.ndarray:
+        """Output the samples still held back by the lookahead."""
+        return self.process(np.zeros(self.delay))
+
+    def apply(self, audio: np.ndarray, gain: float = 1.0, block_size: int = 65536) -> np.ndarray:
+        """Gain and limit a whole buffer in place, block by block. Returns `audio`."""
+        written = 0
+        for start in range(0, len(audio), block_size):
+            out = self.process(audio[start:start + block_size], gain)
+            audio[written:written + len(out)] = out
+            written += len(out)
+        out = self.flush()
+        audio[written:written + len(out)] = out[:len(audio) - written]
+        return audio
+
+
+def measure(blocks, sr: int) -> Tuple[float, float]:
+    """(integrated LUFS, sample peak) of an iterable of blocks."""
+    loudness, peak = LoudnessMeter(sr), PeakMeter()
+    for block in blocks:
+        peak.update(loudness.update(block))
+    return loudness.integrated(), peak.peak
@@ -1,15 +1,22 @@
-import time
 import random
 import os
 import numpy as np
-import librosa
 import soundfile as sf
-import re
 import uuid
 import json
 import sys
 from datetime import datetime
-from multiprocessing import Process
+
+from clip_cache import ClipCache
+from clip_store import ClipStore
+from voice_index import get_voice_index
+from plan import TrackPlan, plan_peak, render_plan
+from scheduler import JobScheduler
+from clip_bank import ClipBank
+from effects import EffectSettings
+from noise import NoiseLibrary, parse_noise_spec
+from loudness import LoudnessMeter, PeakMeter, TruePeakLimiter
+from seeding import job_seeds, new_seed, seed_metadata
 
 # ==========================
 # USER CONFIGURATION
@@ -82,11 +89,14 @@ CONFIG = [
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_ROOT = os.path.join(BASE_DIR, "output")
 VOICES_DIR = os.path.join(BASE_DIR, "agent_voices", "profile")
+STORE_DIR = os.path.join(BASE_DIR, "agent_voices", "store")
+CLIP_EXTENSIONS = frozenset({".mp3"})
 
 # ==========================
 # Audio Settings
 SR = 8000  # Sample rate (Hz)
 USE_MULTIPROCESSING = True  # Enable parallel processing
+MAX_WORKERS = None  # Worker processes (None = from CPU count and free memory)
 
 # Duration Settings (in seconds)
 BASE_DURATION_SECONDS = 1  # 1 hour 20 minutes (80 min)
@@ -104,11 +114,32 @@ FADE_MAX = 0.9  # Maximum fade level
 CLIP_TRIM_CHANCE = 0.2  # Probability of trimming clip end (0.0-1.0)
 CLIP_TRIM_MIN = 0.85  # Minimum clip trim ratio
 CLIP_TRIM_MAX = 0.95  # Maximum clip trim ratio
+GAIN_DB_MIN = -1.0  # Per-clip gain range (dB), scaled by energy
+GAIN_DB_MAX = 1.5
+CLIP_EFFECTS = EffectSettings(
+    fade_chance=FADE_CHANCE, fade_min=FADE_MIN, fade_max=FADE_MAX,
+    trim_chance=CLIP_TRIM_CHANCE, trim_min=CLIP_TRIM_MIN, trim_max=CLIP_TRIM_MAX,
+    gain_db_min=GAIN_DB_MIN, gain_db_max=GAIN_DB_MAX,
+)
 
 # Audio Mixing Settings
 BG_NOISE_LEVEL = 0.01  # Background noise amplitude level
+BG_NOISE_LEVELS = {}  # Per-bed level overrides, e.g. {"white_noise": 0.005}; mix beds with "fan+white_noise"
+NOISE_CROSSFADE_SECONDS = 0.5  # Crossfade at each noise loop seam
+MIX_BLOCK_SECONDS = 2.0  # Block size for noise mixing / peak tracking
 PEAK_NORMALIZATION = 0.9  # Peak normalization level (0.0-1.0)
 FINAL_PEAK_NORMALIZATION = 0.95  # Final peak normalization after mixing
+NORMALIZATION_MODE = "peak"  # "peak" (FINAL_PEAK_NORMALIZATION) or "lufs" (TARGET_LUFS, true-peak limited)
+TARGET_LUFS = -18.0  # Integrated loudness target in "lufs" mode
+TRUE_PEAK_CEILING_DB = -1.0  # Limiter ceiling (dBTP) in "lufs" mode
+MIC_COLOR_COEF = 0.93  # Mic coloring pre-emphasis coefficient
+
+# Clip Cache Settings
+CLIP_CACHE_BYTES = 256 * 1024 * 1024  # Decoded clips kept in RAM per process
+REFRESH_CLIP_STORE = True  # Pre-decode changed clips (and their mic_color variant) into STORE_DIR before spawning jobs
+clip_store = ClipStore(VOICES_DIR, STORE_DIR)
+clip_cache = ClipCache(max_bytes=CLIP_CACHE_BYTES, store=clip_store)
+noise_library = NoiseLibrary(os.path.join(BASE_DIR, "bg_noise"), SR, NOISE_CROSSFADE_SECONDS, clip_cache)
 
 # ==========================
 # ROUND LOGIC
@@ -154,17 +185,6 @@ INTENSITY = {
     "round_result": 0.5,   # emotional but controlled
 }
 
-# ==========================
-# VOICE FX
-# ==========================
-
-def soften_voice(audio):
-    audio *= 0.9
-    return librosa.effects.preemphasis(audio, coef=0.85)
-
-def mic_color(audio):
-    return librosa.effects.preemphasis(audio, coef=0.93)
-
 # ==========================
 # CORE FUNCTIONS
 # ==========================
@@ -178,126 +198,143 @@ def get_current_phase(elapsed):
         return "late"
     return "end"
 
-def play_random_clip_from(source, state, voice_type):
-    folder = os.path.join(BASE_DIR, "agent_voices", "profile", voice_type, source)
+def load_clip(path):
+    # Cached clips are already mic_color'd and read-only
+    return clip_cache.get(path, SR, preemphasis=MIC_COLOR_COEF)
 
-    if not os.path.exists(folder):
-        return
-
-    files = [f for f in os.listdir(folder) if f.endswith(".mp3")]
-    if not files:
+def play_random_clip_from(source, state, voice_type):
+    voice_index = get_voice_index(os.path.join(VOICES_DIR, voice_type), CLIP_EXTENSIONS)
+    file = voice_index.choice(source, state["rng"])
+    if file is None:
         return
 
-    file = random.choice(files)
-    audio, _ = librosa.load(os.path.join(folder, file), sr=SR)
+    # Only the length is needed to plan; audio is touched in render_plan
+    length = clip_cache.length(file, SR, preemphasis=MIC_COLOR_COEF)
 
     intensity = INTENSITY.get(source, 0.4)
     state["energy"] = state["energy"] * 0.7 + intensity * 0.3
 
-    if random.random() < CLIP_TRIM_CHANCE:
-        audio = audio[: int(len(audio) * random.uniform(CLIP_TRIM_MIN, CLIP_TRIM_MAX))]
-
-    # if USER_NAME == "g3ooorge":
-    #     audio = soften_voice(audio)
-
-    if random.random() < FADE_CHANCE:
-        fade = np.linspace(1.0, random.uniform(FADE_MIN, FADE_MAX), len(audio))
-        audio *= fade
+    # Trim/fade/gain are drawn here and applied in one pass by render_plan
+    length, gain, fade_to = CLIP_EFFECTS.sample(length, state["energy"], state["rng"])
 
-    gain_db = random.uniform(-1.0, 1.5) * state["energy"]
-    audio *= 10 ** (gain_db / 20)
-
-    audio = mic_color(audio)
-    state["audio"] = np.concatenate([state["audio"], audio])
+    state["plan"].add_clip(file, length, gain=gain, fade_to=fade_to)
 
 def add_silence(seconds, state):
-    silence = np.zeros(int(seconds * SR))
-    state["audio"] = np.concatenate([state["audio"], silence])
+    state["plan"].add_silence(int(seconds * SR))
+
+def mix_background_noise(speech, bg_noise, level=None, meter=None, rng=random):
+    """Mix noise beds into `speech` in place, feeding the result to `meter` if given.
 
-def mix_background_noise(speech, bg_noise, level=None):
+    The beds' start offsets are drawn from `rng`.
+    """
     if level is None:
         level = BG_NOISE_LEVEL
-    noise_path = os.path.join(BASE_DIR, "bg_noise", f"{bg_noise}.mp3")
-    if not os.path.exists(noise_path):
-        return speech
 
     try:
-        noise, _ = librosa.load(noise_path, sr=SR)
-
-        if len(noise) < len(speech):
-            noise = np.tile(noise, int(np.ceil(len(speech) / len(noise))))
-
-        noise = noise[: len(speech)]
-        return speech + noise * level
-    except (MemoryError, np.core._exceptions._ArrayMemoryError) as e:
+        # Beds are decoded and made loop-ready once per process; every file
+        # gets its own random start offsets and nothing is tiled to track length
+        mixer = noise_library.mixer(bg_noise, level, BG_NOISE_LEVELS, rng)
+    except Exception as e:
         print(f"[WARNING] Failed to load background noise '{bg_noise}': {e}")
         print("[WARNING] Skipping background noise mixing for this file")
-        return speech
+        mixer = None
+
+    # Block by block, so each block is measured while it is still in cache
+    block_size = int(MIX_BLOCK_SECONDS * SR)
+    for start in range(0, len(speech), block_size):
+        block = speech[start:start + block_size]
+        if mixer is not None:
+            mixer.mix(block)
+        if meter is not None:
+            meter.update(block)
+    return speech
+
+def preload_noise_beds(specs):
+    """Prepare noise beds in the parent so forked workers inherit them."""
+    for spec in specs:
+        for name, _ in parse_noise_spec(spec, BG_NOISE_LEVEL):
+            noise_library.loop(name)
 
 # ==========================
 # ROUND GENERATION
 # ==========================
 
 def generate_round(state, voice_type):
-    state["energy"] *= random.uniform(0.6, 0.85)
-    start = time.time()
+    rng = state["rng"]
+    state["energy"] *= rng.uniform(0.6, 0.85)
+    # Phases follow the round's position in the track, not the wall clock,
+    # so a seeded plan doesn't depend on how fast it was built
+    start = len(state["plan"])
 
     for source in ROUND_SEQUENCE:
-        phase = get_current_phase(time.time() - start)
+        phase = get_current_phase((len(state["plan"]) - start) / SR)
 
         if source not in PHASE_RULES[phase]:
             continue
-        if random.random() > PLAY_PROBABILITY[source]:
+        if rng.random() > PLAY_PROBABILITY[source]:
             continue
 
-        if random.random() < SILENCE_CHANCE:
-            add_silence(random.uniform(SILENCE_MIN, SILENCE_MAX), state)
+        if rng.random() < SILENCE_CHANCE:
+            add_silence(rng.uniform(SILENCE_MIN, SILENCE_MAX), state)
             continue
 
         play_random_clip_from(source, state, voice_type)
 
-        r = random.random()
+        r = rng.random()
         if r < 0.5:
-            pause = random.uniform(0.05, 0.3)
+            pause = rng.uniform(0.05, 0.3)
         elif r < 0.9:
-            pause = random.uniform(0.4, 1.2)
+            pause = rng.uniform(0.4, 1.2)
         else:
-            pause = random.uniform(2.5, 5.0)
+            pause = rng.uniform(2.5, 5.0)
 
         add_silence(pause, state)
 
-    add_silence(random.uniform(1.0, 3.0), state)
+    add_silence(rng.uniform(1.0, 3.0), state)
 
 # ==========================
 # AUDIO JOB
 # ==========================
 
-def generate_audio_job(username, voice_type, bg_noise, version):
+def generate_audio_job(username, voice_type, bg_noise, version, seed=None):
+    # Every random draw of the job comes from one seeded rng, so the same
+    # seed and voice folder reproduce the file sample for sample
+    if seed is None:
+        seed = new_seed()
+    rng = random.Random(seed)
+
+    EXTRA_SECONDS = rng.randint(EXTRA_DURATION_MIN, EXTRA_DURATION_MAX)
+    TARGET_SECONDS = BASE_DURATION_SECONDS + EXTRA_SECONDS
+
     state = {
-        "audio": np.array([], dtype=np.float32),
+        "plan": TrackPlan(SR),
         "energy": 0.3,
+        "rng": rng,
     }
 
-    EXTRA_SECONDS = random.randint(EXTRA_DURATION_MIN, EXTRA_DURATION_MAX)
-    TARGET_SECONDS = BASE_DURATION_SECONDS + EXTRA_SECONDS
-
-    print(f"[JOB START] {username} - {bg_noise} v{version}")
+    print(f"[JOB START] {username} - {bg_noise} v{version} (seed {seed})")
 
-    while len(state["audio"]) / SR < TARGET_SECONDS:
+    while len(state["plan"]) / SR < TARGET_SECONDS:
         generate_round(state, voice_type)
 
-    audio = state["audio"]
-
-    peak = np.max(np.abs(audio))
-    if peak > 0:
-        audio = audio / peak * PEAK_NORMALIZATION
-
-    if bg_noise != "none":
-        audio = mix_background_noise(audio, bg_noise)
-
-    peak = np.max(np.abs(audio))
-    if peak > 0:
-        audio = audio / peak * FINAL_PEAK_NORMALIZATION
+    # The speech peak comes from the plan, so normalization is folded into the
+    # render; without noise that is already the final level
+    speech_peak = plan_peak(state["plan"], load_clip)
+    speech_level = PEAK_NORMALIZATION if bg_noise != "none" else FINAL_PEAK_NORMALIZATION
+    scale = speech_level / speech_peak if speech_peak > 0 else 1.0
+    audio = render_plan(state["plan"], load_clip, scale=scale)
+
+    if NORMALIZATION_MODE == "lufs":
+        # Loudness is measured while noise is added, then gain + true-peak limiting run in place
+        meter = LoudnessMeter(SR)
+        mix_background_noise(audio, bg_noise, meter=meter, rng=rng)
+        limiter = TruePeakLimiter(SR, TRUE_PEAK_CEILING_DB)
+        limiter.apply(audio, meter.gain(TARGET_LUFS), int(MIX_BLOCK_SECONDS * SR))
+    elif bg_noise != "none":
+        # The mix peak is tracked while noise is added; the final level is one in-place scale
+        meter = PeakMeter()
+        mix_background_noise(audio, bg_noise, meter=meter, rng=rng)
+        audio *= np.float32(meter.gain(FINAL_PEAK_NORMALIZATION))
 
     out_dir = os.path.join(OUTPUT_ROOT, username)
     os.makedirs(out_dir, exist_ok=True)
@@ -308,25 +345,51 @@ def generate_audio_job(username, voice_type, bg_noise, version):
     file_name = f"{date_str}_{unique_id}"
 
     out_path = os.path.join(out_dir, f"{file_name}.wav")
-    sf.write(out_path, audio, SR)
+    # The seed goes into the file's comment tag so it can be regenerated
+    with sf.SoundFile(out_path, "w", SR, 1) as f:
+        for key, value in seed_metadata(seed).items():
+            setattr(f, key, value)
+        f.write(audio)
 
-    print(f"[JOB DONE] {out_path}")
+    print(f"[JOB DONE] {out_path} (seed {seed})")
 
 # ==========================
 # PARALLEL RUNNER
 # ==========================
 
-def run_bg_noise_job(username, voice_type, bg_noise, audios_to_add):
-    for v in range(1, audios_to_add + 1):
-        generate_audio_job(username, voice_type, bg_noise, v)
+def run_bg_noise_job(username, voice_type, bg_noise, audios_to_add, seed=None):
+    for v, file_seed in enumerate(job_seeds(audios_to_add, seed), start=1):
+        generate_audio_job(username, voice_type, bg_noise, v, file_seed)
+
+def build_clip_bank(voice_types):
+    """Decode every clip of `voice_types` once into shared memory for the workers."""
+    paths = []
+    for voice_type in voice_types:
+        voice_index = get_voice_index(os.path.join(VOICES_DIR, voice_type), CLIP_EXTENSIONS)
+        for category in voice_index.categories():
+            paths.extend(voice_index.clips(category))
+
+    # Sized from the store index, then filled clip by clip without caching,
+    # so the parent never holds a second full copy of the clips
+    bank = ClipBank.build(
+        paths,
+        lambda path: clip_cache.load(path, SR, preemphasis=MIC_COLOR_COEF),
+        SR,
+        MIC_COLOR_COEF,
+        clip_length=lambda path: clip_cache.length(path, SR, preemphasis=MIC_COLOR_COEF),
+    )
+    clip_cache.clear()  # The parent's copies now live in the bank
+    return bank
+
+def use_clip_bank(bank):
+    """Pool initializer: serve clips from the parent's shared-memory bank."""
+    clip_cache.bank = bank
 
 # ==========================
 # MAIN
 # ==========================
 
 if __name__ == "__main__":
-    processes = []
-    
     # Check if command line arguments are provided
     if len(sys.argv) > 1:
         # Parse JSON argument from command line
@@ -340,6 +403,7 @@ if __name__ == "__main__":
             for incoming in incoming_config:
                 username = incoming["username"]
                 audios = incoming.get("audios", 1)
+                seed = incoming.get("seed")  # Optional: files get seed, seed+1, ...
                 
                 # Find matching account in existing accounts list
                 account_data = next((acc for acc in accounts if acc["username"] == username), None)
@@ -350,7 +414,8 @@ if __name__ == "__main__":
                         "username": username,
                         "voice_type": account_data["voice_type"],
                         "noises": account_data["noises"],
-                        "audios": audios
+                        "audios": audios,
+                        "seed": seed
                     })
                     print(f"   ✅ {username}: {account_data['voice_type']}, {account_data['noises']} noise, {audios} audio(s)")
                 else:
@@ -360,37 +425,62 @@ if __name__ == "__main__":
                         "username": username,
                         "voice_type": "real_brendan666",
                         "noises": "none",
-                        "audios": audios
+                        "audios": audios,
+                        "seed": seed
                     })
                     
         except json.JSONDecodeError as e:
             print(f"❌ Error parsing JSON argument: {e}")
-            print("Expected format: '[{\"username\": \"player1\", \"audios\": 1}]'")
+            print("Expected format: '[{\"username\": \"player1\", \"audios\": 1, \"seed\": 42}]'")
             sys.exit(1)
         except Exception as e:
             print(f"❌ Unexpected error: {e}")
             sys.exit(1)
 
-    for config in CONFIG:
-        username = config["username"]
-        voice_type = config["voice_type"]
-        noises = config["noises"]
-        audios = config["audios"]
+    if REFRESH_CLIP_STORE:
+        for voice_type in sorted({config["voice_type"] for config in CONFIG if config["voice_type"]}):
+            decoded, removed = clip_store.build(voice_type, SR, preemphasis=(MIC_COLOR_COEF,))
+            print(f"🗂️  Clip store {voice_type}: {decoded} decoded, {removed} removed")
+
+    scheduler = None
+    bank = None
+    try:
+        if USE_MULTIPROCESSING:
+            # Accounts sharing a voice share one copy of its clips
+            bank = build_clip_bank(sorted({config["voice_type"] for config in CONFIG if config["voice_type"]}))
+            print(f"🧠 Clip bank: {len(bank)} clips, {bank.nbytes / (1024 * 1024):.1f}MB shared")
+            preload_noise_beds(sorted({config["noises"] for config in CONFIG}))
+            scheduler = JobScheduler(MAX_WORKERS, initializer=use_clip_bank, initargs=(bank,))
+        futures = []
+
+        for config in CONFIG:
+            username = config["username"]
+            voice_type = config["voice_type"]
+            noises = config["noises"]
+            audios = config["audios"]
+            seed = config.get("seed")
         
-        print(f"\n=== Starting generation for {username} ({voice_type}) with {noises} noise ===")
+            print(f"\n=== Starting generation for {username} ({voice_type}) with {noises} noise ===")
         
-        if USE_MULTIPROCESSING:
-            p = Process(
-                target=run_bg_noise_job,
-                args=(username, voice_type, noises, audios)
-            )
-            p.start()
-            processes.append(p)
-        else:
-            run_bg_noise_job(username, voice_type, noises, audios)
+            if scheduler:
+                # One pool job per file, bounded by the worker count
+                for v, file_seed in enumerate(job_seeds(audios, seed), start=1):
+                    futures.append(scheduler.submit(generate_audio_job, username, voice_type, noises, v, file_seed))
+            else:
+                run_bg_noise_job(username, voice_type, noises, audios, seed)
     
-    if USE_MULTIPROCESSING:
-        for p in processes:
-            p.join()
+        if scheduler:
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"❌ Job failed: {e}")
+    finally:
+        # The bank's shared memory outlives the process unless it is unlinked,
+        # so it is freed on errors and Ctrl-C too
+        if scheduler:
+            scheduler.shutdown()
+        if bank is not None:
+            bank.close()
 
     print("\n✅ All audio generation jobs completed.")
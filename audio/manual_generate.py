@@ -1,7 +1,6 @@
-import json
-import subprocess
 import sys
-from pathlib import Path
+
+import audio_generator_improved as generator
 
 # Usernames to generate audio for
 USERNAMES = [
@@ -14,13 +13,6 @@ AUDIOS_PER_USER = 5
 
 
 def run_generation():
-    script_dir = Path(__file__).resolve().parent
-    generator_py = script_dir / "audio_generator_improved.py"
-    
-    if not generator_py.exists():
-        print(f"❌ Error: {generator_py} not found")
-        sys.exit(1)
-    
     print(f"🎵 Audio Generation Started")
     print(f"=" * 60)
     print(f"Users: {', '.join(USERNAMES)}")
@@ -28,22 +20,21 @@ def run_generation():
     print(f"=" * 60)
     print()
 
-    for i, username in enumerate(USERNAMES, 1):
-        print(f"[{i}/{len(USERNAMES)}] Processing: {username}")
-        
-        cmd = [sys.executable, str(generator_py), username, str(AUDIOS_PER_USER)]
-        
-        try:
-            result = subprocess.run(cmd, check=True, capture_output=False)
-            print(f"✓ Completed: {username}\n")
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Failed: {username} (Exit code: {e.returncode})\n")
-            continue
-    
+    # One process for the whole roster: configs are fetched in a single API
+    # call and renders for every user share the same worker pool
+    entries = {username: AUDIOS_PER_USER for username in USERNAMES}
+    results = generator.run_batch(entries)
+
+    failed = [u for u in USERNAMES if len(results.get(u, [])) < AUDIOS_PER_USER]
+
     print(f"=" * 60)
-    print(f"✅ All audio generation jobs completed!")
+    if failed:
+        print(f"❌ Incomplete: {', '.join(failed)}")
+    else:
+        print(f"✅ All audio generation jobs completed!")
     print(f"=" * 60)
+    return not failed
 
 
 if __name__ == "__main__":
-    run_generation()
+    sys.exit(0 if run_generation() else 1)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Preallocated channel-major buffer holding one track per speaker, with per-channel cursors and peaks."""
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+DEFAULT_HEADROOM = 0.05  # Fraction of the target duration reserved for overshoot
+MIN_HEADROOM_SECONDS = 60.0  # A round can overshoot the target by up to a minute
+GROWTH_FACTOR = 1.5
+
+
+class Track:
+    """Single-channel view of a MultiTrackBuffer with an append-only write API."""
+
+    def __init__(self, buffer: "MultiTrackBuffer", channel: int):
+        self._buffer = buffer
+        self.channel = channel
+
+    def __len__(self) -> int:
+        return self._buffer.cursors[self.channel]
+
+    @property
+    def peak(self) -> float:
+        return self._buffer.peaks[self.channel]
+
+    def write(self, clip: np.ndarray, gain: Optional[float] = None) -> int:
+        return self._buffer.write(self.channel, clip, gain)
+
+    def silence(self, samples: int) -> None:
+        self._buffer.silence(self.channel, samples)
+
+    def pad_to(self, length: int) -> None:
+        self._buffer.pad_to(self.channel, length)
+
+
+class MultiTrackBuffer:
+    """Append-only float32 (channels, frames) timeline with one cursor per channel."""
+
+    def __init__(self, capacity: int, channels: int, dtype=np.float32):
+        self._buf = np.zeros((channels, max(int(capacity), 1)), dtype=dtype)
+        self.cursors = [0] * channels
+        self.peaks = [0.0] * channels  # Largest absolute sample written per channel
+
+    @classmethod
+    def for_duration(cls, seconds: float, sr: int, channels: int,
+                     headroom: float = DEFAULT_HEADROOM) -> "MultiTrackBuffer":
+        """Buffer sized for `seconds` of audio per channel plus overshoot headroom."""
+        extra = max(seconds * headroom, MIN_HEADROOM_SECONDS)
+        return cls(int((seconds + extra) * sr), channels)
+
+    def __len__(self) -> int:
+        """Frames up to the furthest channel; shorter channels end in silence."""
+        return max(self.cursors)
+
+    @property
+    def channels(self) -> int:
+        return self._buf.shape[0]
+
+    @property
+    def capacity(self) -> int:
+        return self._buf.shape[1]
+
+    @property
+    def data(self) -> np.ndarray:
+        """(channels, frames) view of the written region (no copy)."""
+        return self._buf[:, :len(self)]
+
+    def channel(self, channel: int) -> np.ndarray:
+        """Contiguous view of one channel's written region, padded to len(self)."""
+        return self._buf[channel, :len(self)]
+
+    def interleaved(self, block_size: int) -> Iterator[np.ndarray]:
+        """The written region as (frames, channels) blocks for multichannel writers."""
+        frames = len(self)
+        for start in range(0, frames, block_size):
+            yield self._buf[:, start:min(start + block_size, frames)].T
+
+    def track(self, channel: int) -> Track:
+        return Track(self, channel)
+
+    def tracks(self) -> List[Track]:
+        return [Track(self, ch) for ch in range(self.channels)]
+
+    def write(self, channel: int, clip: np.ndarray, gain: Optional[float] = None) -> int:
+        """Copy `clip` (optionally scaled) at `channel`'s cursor. Returns its start frame."""
+        start = self.cursors[channel]
+        end = start + len(clip)
+        self.reserve(end)
+        dst = self._buf[channel, start:end]
+        if gain is None:
+            dst[:] = clip
+        else:
+            np.multiply(clip, gain, out=dst, casting="unsafe")
+        if end > start:
+            self.peaks[channel] = max(self.peaks[channel], float(np.max(dst)), float(-np.min(dst)))
+        self.cursors[channel] = end
+        return start
+
+    def silence(self, channel: int, samples: int) -> None:
+        """Advance `channel`'s cursor by `samples` of silence."""
+        samples = max(int(samples), 0)
+        self.reserve(self.cursors[channel] + samples)
+        self.cursors[channel] += samples
+
+    def pad_to(self, channel: int, length: int) -> None:
+        """Extend `channel` with silence up to `length` frames (no-op if already longer)."""
+        if length > self.cursors[channel]:
+            self.silence(channel, length - self.cursors[channel])
+
+    def normalize(self, target: float) -> np.ndarray:
+        """Scale every channel in place so its own peak is `target`. Returns data."""
+        data = self.data
+        for channel, peak in enumerate(self.peaks):
+            if peak > 0:
+                data[channel] *= self._buf.dtype.type(target / peak)
+        self.peaks = [target if p > 0 else 0.0 for p in self.peaks]
+        return data
+
+    def reserve(self, length: int) -> None:
+        """Ensure capacity for `length` frames, growing geometrically."""
+        if length <= self.capacity:
+            return
+        new_capacity = max(length, int(self.capacity * GROWTH_FACTOR))
+        grown = np.zeros((self.channels, new_capacity), dtype=self._buf.dtype)
+        used = len(self)
+        grown[:, :used] = self._buf[:, :used]
+        self._buf = grown
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Background noise beds, looped seamlessly and mixed under speech block by block."""
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from clip_cache import ClipCache
+from effects import EffectChain
+
+
+def mix_loop(dst: np.ndarray, loop: np.ndarray, level: float, offset: int = 0,
+             chain: Optional[EffectChain] = None) -> int:
+    """Add `loop` repeated from sample `offset` into `dst` in place, scaled by `level`.
+
+    Returns the loop offset following the last sample written, so
+    consecutive blocks of a stream can continue the same loop.
+    """
+    period = len(loop)
+    if period == 0 or len(dst) == 0:
+        return offset
+    chain = chain or EffectChain()
+
+    offset %= period
+    pos = 0
+    while pos < len(dst):
+        n = min(period - offset, len(dst) - pos)
+        chain.mix(dst[pos:pos + n], loop, offset, offset + n, period, gain=level)
+        pos += n
+        offset = (offset + n) % period
+    return offset
+
+
+def seamless_loop(samples: np.ndarray, crossfade: int) -> np.ndarray:
+    """Loop of len(samples) - crossfade samples whose wrap-around is crossfaded.
+
+    The last `crossfade` samples are faded out over the first `crossfade`
+    (equal power, as bed noise is uncorrelated), so playing the result
+    end-to-start continues the recording without a seam.
+    """
+    crossfade = min(int(crossfade), len(samples) // 2)
+    if crossfade <= 0:
+        return samples
+    period = len(samples) - crossfade
+    loop = np.array(samples[:period], dtype=np.float32)
+    t = (np.arange(crossfade, dtype=np.float32) + 0.5) * np.float32(np.pi / 2 / crossfade)
+    loop[:crossfade] *= np.sin(t)
+    loop[:crossfade] += samples[period:] * np.cos(t)
+    return loop
+
+
+def parse_noise_spec(spec: Optional[str], default_level: float,
+                     levels: Optional[Dict[str, float]] = None) -> List[Tuple[str, float]]:
+    """[(bed name, level)] for a spec like "fan+white_noise:0.005"."""
+    beds = []
+    for part in (spec or "").split("+"):
+        name, _, level = part.strip().partition(":")
+        if not name or name == "none":
+            continue
+        beds.append((name, float(level) if level else (levels or {}).get(name, default_level)))
+    return beds
+
+
+class NoiseMixer:
+    """Streams several looped beds, each from its own random offset, into blocks."""
+
+    def __init__(self, beds: List[Tuple[np.ndarray, float]], rng=random):
+        self._beds = [[loop, level, rng.randrange(len(loop))] for loop, level in beds if len(loop)]
+        self._starts = [bed[2] for bed in self._beds]
+        self._chain = EffectChain()
+
+    def __bool__(self) -> bool:
+        return bool(self._beds)
+
+    @property
+    def peak(self) -> float:
+        """Upper bound on the absolute value this mixer adds to any sample."""
+        return sum(abs(level) * float(max(np.max(loop), -np.min(loop))) for loop, level, _ in self._beds)
+
+    def reset(self) -> None:
+        """Rewind every bed to its start offset, so the same noise can be mixed again."""
+        for bed, start in zip(self._beds, self._starts):
+            bed[2] = start
+
+    def mix(self, block: np.ndarray) -> np.ndarray:
+        """Add the next len(block) samples of every bed into `block` in place."""
+        for bed in self._beds:
+            loop, level, offset = bed
+            bed[2] = mix_loop(block, loop, level, offset, self._chain)
+        return block
+
+
+class NoiseLibrary:
+    """Loop-ready noise beds from a directory, prepared once per process."""
+
+    def __init__(self, noise_dir: str, sample_rate: int, crossfade_seconds: float = 0.5,
+                 cache: Optional[ClipCache] = None, extension: str = ".mp3"):
+        self.noise_dir = str(noise_dir)
+        self.sample_rate = sample_rate
+        self.crossfade = int(crossfade_seconds * sample_rate)
+        self.cache = cache or ClipCache()
+        self.extension = extension
+        self._loops: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.noise_dir, f"{name}{self.extension}")
+
+    def loop(self, name: str) -> Optional[np.ndarray]:
+        """Seamless loop for bed `name`, or None if there is no such file."""
+        path = self.path(name)
+        if not os.path.exists(path):
+            return None
+        key = (path, os.stat(path).st_mtime_ns)
+        loop = self._loops.get(key)
+        if loop is None:
+            loop = seamless_loop(self.cache.get(path, self.sample_rate), self.crossfade)
+            loop.setflags(write=False)
+            self._loops[key] = loop
+        return loop
+
+    def mixer(self, spec: Optional[str], default_level: float, levels: Optional[Dict[str, float]] = None,
+              rng=random) -> NoiseMixer:
+        """Mixer for every bed in `spec` that exists; missing beds are skipped."""
+        beds = []
+        for name, level in parse_noise_spec(spec, default_level, levels):
+            loop = self.loop(name)
+            if loop is not None:
+                beds.append((loop, level))
+        return NoiseMixer(beds, rng)
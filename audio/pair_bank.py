@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Matched clip pairs for two-speaker conversations, processed once per voice pair before workers fork."""
+import logging
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from voice_index import PairIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ClipPair:
+    """Both processed clips of a match, with their durations in seconds."""
+    first: np.ndarray
+    second: np.ndarray
+    first_seconds: float
+    second_seconds: float
+
+
+class PairBank:
+    """Category -> processed ClipPairs for two voice profiles."""
+
+    def __init__(self, pairs: Dict[str, List[ClipPair]]):
+        self._pairs = pairs
+
+    @classmethod
+    def build(cls, index: PairIndex, categories: List[str], load: Callable[[str], np.ndarray],
+              sr: int) -> "PairBank":
+        """Process every pair of `categories` in `index` with `load(path)`.
+
+        Pairs whose clips fail to load are logged and left out.
+        """
+        pairs: Dict[str, List[ClipPair]] = {}
+        for category in categories:
+            entries = []
+            for first_path, second_path in index.pairs(category):
+                try:
+                    first, second = load(first_path), load(second_path)
+                except Exception as e:
+                    logger.warning(f"Skipping pair {first_path} / {second_path}: {e}")
+                    continue
+                first.setflags(write=False)
+                second.setflags(write=False)
+                entries.append(ClipPair(first, second, len(first) / sr, len(second) / sr))
+            if entries:
+                pairs[category] = entries
+        return cls(pairs)
+
+    def pairs(self, category: str) -> List[ClipPair]:
+        return self._pairs.get(category, [])
+
+    def choice(self, category: str, rng: random.Random = random) -> Optional[ClipPair]:
+        pairs = self._pairs.get(category)
+        return rng.choice(pairs) if pairs else None
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self._pairs.values())
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by distinct clip arrays."""
+        arrays = {id(a): a for pairs in self._pairs.values() for p in pairs for a in (p.first, p.second)}
+        return sum(a.nbytes for a in arrays.values())
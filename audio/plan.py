@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Two-pass track generation: record a TrackPlan of clip events, then render it in one pass or as blocks."""
+import json
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from effects import EffectChain
+
+PLAN_VERSION = 1
+
+
+@dataclass(frozen=True)
+class ClipEvent:
+    """One clip placed on the timeline."""
+    start: int            # Output sample the clip starts at
+    clip: str             # Clip id (source path) passed to the loader
+    length: int           # Samples kept from the start of the clip (trim)
+    gain: float = 1.0     # Linear gain
+    fade_to: float = 1.0  # Linear fade from 1.0 to fade_to over the clip
+
+    @property
+    def end(self) -> int:
+        return self.start + self.length
+
+
+class TrackPlan:
+    """Append-only event schedule with a sample cursor."""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.events: List[ClipEvent] = []
+        self.length = 0
+        self.metadata: Dict[str, Any] = {}  # Free-form job info saved with the plan (e.g. its seed)
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def seconds(self) -> float:
+        return self.length / self.sample_rate
+
+    def add_clip(self, clip: str, length: int, gain: float = 1.0, fade_to: float = 1.0) -> ClipEvent:
+        """Place `length` samples of `clip` at the cursor and advance past it."""
+        event = ClipEvent(self.length, str(clip), int(length), float(gain), float(fade_to))
+        self.events.append(event)
+        self.length = event.end
+        return event
+
+    def add_silence(self, samples: int) -> None:
+        self.length += max(int(samples), 0)
+
+    def pad_to(self, length: int) -> None:
+        self.length = max(self.length, int(length))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": PLAN_VERSION,
+            "sample_rate": self.sample_rate,
+            "length": self.length,
+            "events": [asdict(e) for e in self.events],
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrackPlan":
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"Unsupported plan version: {data.get('version')}")
+        plan = cls(data["sample_rate"])
+        plan.events = [ClipEvent(**e) for e in data["events"]]
+        plan.length = data["length"]
+        plan.metadata = data.get("metadata", {})
+        return plan
+
+    def save(self, path: Union[str, Path]) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TrackPlan":
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+
+ClipLoader = Callable[[str], np.ndarray]
+
+
+def _event_samples(event: ClipEvent, clip: np.ndarray, track_length: int) -> int:
+    """Samples of `event` that actually land on the track."""
+    return max(min(event.length, len(clip), track_length - event.start), 0)
+
+
+def render_plan(
+    plan: TrackPlan,
+    load_clip: ClipLoader,
+    on_progress: Optional[Callable[[int], None]] = None,
+    scale: float = 1.0,
+) -> np.ndarray:
+    """Render `plan` into a single preallocated float32 buffer.
+
+    Events are mixed (added) so overlapping clips sum. `on_progress` is
+    called with the end sample of each rendered event, then the track length.
+    `scale` is applied to every event (e.g. a normalization gain).
+    """
+    out = np.zeros(plan.length, dtype=np.float32)
+    chain = EffectChain()
+
+    for event in plan.events:
+        clip = load_clip(event.clip)
+        n = _event_samples(event, clip, plan.length)
+        if n == 0:
+            continue
+
+        chain.mix(out[event.start:event.start + n], clip, 0, n, n, event.gain * scale, event.fade_to)
+
+        if on_progress is not None:
+            on_progress(event.start + n)
+
+    if on_progress is not None:
+        on_progress(plan.length)
+    return out
+
+
+def iter_render(
+    plan: TrackPlan,
+    load_clip: ClipLoader,
+    block_size: int,
+    scale: float = 1.0,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> Iterator[np.ndarray]:
+    """Render `plan` as consecutive float32 blocks of at most `block_size` samples.
+
+    Only one block is held in memory; the yielded array is reused for the
+    next block, so consumers must write or copy it before advancing.
+    `scale` is applied to every event (e.g. a normalization gain).
+    """
+    events = sorted(plan.events, key=lambda e: e.start)
+    block = np.zeros(block_size, dtype=np.float32)
+    chain = EffectChain(block_size)
+    active: List[Tuple[ClipEvent, np.ndarray, int]] = []
+    next_event = 0
+
+    for b0 in range(0, plan.length, block_size):
+        b1 = min(b0 + block_size, plan.length)
+        out = block[:b1 - b0]
+        out.fill(0.0)
+
+        while next_event < len(events) and events[next_event].start < b1:
+            event = events[next_event]
+            clip = load_clip(event.clip)
+            n = _event_samples(event, clip, plan.length)
+            if n > 0:
+                active.append((event, clip, n))
+            next_event += 1
+
+        still_active = []
+        for event, clip, n in active:
+            s0 = max(event.start, b0)
+            s1 = min(event.start + n, b1)
+            if s1 > s0:
+                chain.mix(out[s0 - b0:s1 - b0], clip, s0 - event.start, s1 - event.start, n,
+                          event.gain * scale, event.fade_to)
+            if event.start + n > b1:
+                still_active.append((event, clip, n))
+        active = still_active
+
+        yield out
+
+        if on_progress is not None:
+            on_progress(b1)
+
+
+def plan_peak(plan: TrackPlan, load_clip: ClipLoader, block_size: int = 65536) -> float:
+    """Peak absolute sample value the rendered plan will have.
+
+    For plans without overlapping events this is the largest per-event peak,
+    so no track-sized buffer or extra render is needed. Overlapping plans
+    fall back to a streaming measurement pass.
+    """
+    events = sorted(plan.events, key=lambda e: e.start)
+    if any(a.end > b.start for a, b in zip(events, events[1:])):
+        return max((float(np.max(np.abs(b))) for b in iter_render(plan, load_clip, block_size)), default=0.0)
+
+    peak = 0.0
+    chain = EffectChain()
+    for event in events:
+        clip = load_clip(event.clip)
+        n = _event_samples(event, clip, plan.length)
+        if n == 0:
+            continue
+        peak = max(peak, chain.peak(clip, n, event.gain, event.fade_to))
+    return peak
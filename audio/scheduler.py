@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Process pool for generation jobs, sized from the CPU count and available memory."""
+import os
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_MEMORY_BYTES = 384 * 1024 * 1024
+
+
+def available_memory_bytes() -> Optional[int]:
+    """Memory available for new work, or None if it can't be determined."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_worker_count(job_memory_bytes: int = DEFAULT_JOB_MEMORY_BYTES) -> int:
+    """min(CPU count, jobs that fit in available memory), at least 1."""
+    workers = os.cpu_count() or 1
+    memory = available_memory_bytes()
+    if memory is not None and job_memory_bytes > 0:
+        workers = min(workers, memory // job_memory_bytes)
+    return max(int(workers), 1)
+
+
+class JobScheduler:
+    """ProcessPoolExecutor sized from CPUs and memory, preferring fork workers."""
+
+    def __init__(self, max_workers: Optional[int] = None, job_memory_bytes: int = DEFAULT_JOB_MEMORY_BYTES,
+                 initializer: Optional[Callable[..., None]] = None, initargs: tuple = ()):
+        self.max_workers = max_workers or default_worker_count(job_memory_bytes)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=initializer,
+            initargs=initargs,
+        )
+        logger.info(f"Job scheduler: {self.max_workers} worker(s) ({context.get_start_method()})")
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self) -> "JobScheduler":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.shutdown(wait=exc_type is None)
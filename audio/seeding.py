@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""Per-job seeds, so a track can be regenerated sample for sample from the seed in its comment tag."""
+import secrets
+from typing import Dict, List, Optional
+
+SEED_BITS = 63
+
+
+def new_seed() -> int:
+    """Fresh random seed (independent of any process's random state)."""
+    return secrets.randbits(SEED_BITS)
+
+
+def job_seeds(count: int, seed: Optional[int] = None) -> List[int]:
+    """Seeds for `count` jobs: seed, seed+1, ... or fresh ones when `seed` is None."""
+    if seed is None:
+        return [new_seed() for _ in range(count)]
+    return [seed + i for i in range(count)]
+
+
+def seed_metadata(seed: int) -> Dict[str, str]:
+    """File tags recording `seed` (soundfile string keys)."""
+    return {"comment": f"seed={seed}"}
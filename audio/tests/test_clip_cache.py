@@ -0,0 +1,81 @@
+"""ClipCache decoding, pre-emphasis, LRU bookkeeping and invalidation."""
+import os
+import sys
+from pathlib import Path
+
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from clip_cache import ClipCache
+
+SR = 8000
+
+
+@pytest.fixture
+def clips(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"clip{i}.wav"
+        sf.write(path, np.random.default_rng(i).uniform(-0.5, 0.5, 2000 * (i + 1)), SR)
+        paths.append(str(path))
+    return paths
+
+
+def test_get_is_deterministic_read_only_and_cached(clips):
+    cache = ClipCache()
+    audio = cache.get(clips[0], SR, preemphasis=0.93)
+
+    assert audio.dtype == np.float32 and not audio.flags.writeable
+    assert cache.get(clips[0], SR, preemphasis=0.93) is audio
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_array_equal(ClipCache().get(clips[0], SR, preemphasis=0.93), audio)
+
+
+def test_preemphasis_matches_librosa(clips):
+    raw = ClipCache().get(clips[1], SR)
+    expected = librosa.effects.preemphasis(np.array(raw), coef=0.93)
+    np.testing.assert_allclose(ClipCache().get(clips[1], SR, preemphasis=0.93), expected, atol=1e-6)
+
+
+def test_load_round_trips_without_entering_lru(clips):
+    cache = ClipCache()
+    loaded = cache.load(clips[0], SR, preemphasis=0.93)
+
+    assert len(cache) == 0
+    np.testing.assert_array_equal(loaded, cache.get(clips[0], SR, preemphasis=0.93))
+    assert cache.load(clips[0], SR, preemphasis=0.93) is cache.get(clips[0], SR, preemphasis=0.93)
+    assert cache.length(clips[0], SR, preemphasis=0.93) == len(loaded)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    paths = []
+    for name in "abc":
+        paths.append(str(tmp_path / f"{name}.wav"))
+        sf.write(paths[-1], np.full(1000, 0.1), SR)
+    a, b, c = paths
+    cache = ClipCache(max_bytes=2 * 1000 * 4)  # Room for two clips
+    cache.get(a, SR)
+    cache.get(b, SR)
+    cache.get(a, SR)     # b is now the least recently used
+    cache.get(c, SR)
+
+    assert len(cache) == 2 and cache.nbytes == cache.max_bytes
+    misses = cache.misses
+    cache.get(a, SR)
+    cache.get(c, SR)
+    assert cache.misses == misses
+    cache.get(b, SR)
+    assert cache.misses == misses + 1
+
+
+def test_modified_file_is_decoded_again(clips):
+    cache = ClipCache()
+    before = cache.get(clips[0], SR)
+    sf.write(clips[0], np.zeros(100), SR)
+    st = os.stat(clips[0])
+    os.utime(clips[0], ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert len(cache.get(clips[0], SR)) == 100 != len(before)
@@ -0,0 +1,142 @@
+"""ConfigClient against a stub /api/accounts server on 127.0.0.1."""
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from config_client import DEFAULT_CONFIG, ConfigClient
+
+
+class StubAccounts(BaseHTTPRequestHandler):
+    """Answers POST /api/accounts from server.accounts, recording every batch."""
+    protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse is observable
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        usernames = body["usernames"]
+        self.server.batches.append(usernames)
+        accounts = [self.server.accounts[u] for u in usernames if u in self.server.accounts]
+        data = json.dumps({"count": len(accounts), "accounts": accounts}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def account(username, voice_type="ai_kael"):
+    return {"username": username, "voiceType": voice_type, "backgroundNoise": "fan",
+            "playerType": "player", "discordName": username.upper()}
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubAccounts)
+    httpd.accounts = {name: account(name) for name in ("alpha", "bravo", "charlie", "delta", "echo")}
+    httpd.batches = []
+    httpd.connections = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_client(server, tmp_path, **kwargs):
+    host, port = server.server_address
+    kwargs.setdefault("cache_path", tmp_path / "cache.json")
+    kwargs.setdefault("profiles_file", tmp_path / "profiles.json")
+    kwargs.setdefault("timeout", 5)
+    return ConfigClient(f"http://{host}:{port}/", **kwargs)
+
+
+def test_batches_requests_by_batch_size(server, tmp_path):
+    client = make_client(server, tmp_path, batch_size=2)
+    configs = client.fetch(["alpha", "bravo", "charlie", "delta", "echo", "alpha"])
+
+    assert server.batches == [["alpha", "bravo"], ["charlie", "delta"], ["echo"]]
+    assert set(configs) == {"alpha", "bravo", "charlie", "delta", "echo"}
+    assert configs["alpha"] == {"voice_type": "ai_kael", "background_noise": "fan",
+                                "player_type": "player", "discord_name": "ALPHA"}
+    client.close()
+
+
+def test_reuses_one_connection(server, tmp_path):
+    client = make_client(server, tmp_path, batch_size=1)
+    client.fetch(["alpha", "bravo", "charlie"], use_cache=False)
+    client.fetch(["delta"], use_cache=False)
+
+    assert len(server.batches) == 4
+    assert server.connections == 1
+    client.close()
+
+
+def test_cache_hits_within_ttl_and_refetches_after(server, tmp_path):
+    client = make_client(server, tmp_path, ttl=3600)
+    client.fetch(["alpha", "bravo"])
+    assert client.fetch(["alpha", "bravo"]).keys() == {"alpha", "bravo"}
+    assert len(server.batches) == 1
+
+    # A new client reads the same cache file
+    assert make_client(server, tmp_path, ttl=3600).fetch(["alpha"]).keys() == {"alpha"}
+    assert len(server.batches) == 1
+
+    client.ttl = 0
+    client.fetch(["alpha"])
+    assert server.batches[1:] == [["alpha"]]
+    client.close()
+
+
+def test_uses_expired_cache_when_server_is_down(server, tmp_path):
+    make_client(server, tmp_path).fetch(["alpha"])
+    server.shutdown()
+    server.server_close()
+
+    client = make_client(server, tmp_path, ttl=0, timeout=1)
+    configs = client.fetch(["alpha", "bravo"])
+    assert configs.keys() == {"alpha"}
+    assert configs["alpha"]["voice_type"] == "ai_kael"
+
+
+def test_falls_back_to_profiles_then_default(server, tmp_path):
+    profile = {"voice_type": "real_brendan666", "noises": "white_noise"}
+    (tmp_path / "profiles.json").write_text(json.dumps({"zulu": profile}))
+    client = make_client(server, tmp_path)
+    configs = client.resolve(["alpha", "zulu", "yankee"])
+
+    assert configs["alpha"]["voice_type"] == "ai_kael"
+    assert configs["zulu"] == profile
+    assert configs["yankee"] == DEFAULT_CONFIG
+    client.close()
+
+
+def test_skips_malformed_cache_entries(server, tmp_path):
+    (tmp_path / "cache.json").write_text(json.dumps({
+        "alpha": {"config": {"voice_type": "old"}},          # No fetched_at
+        "bravo": {"config": "ai_kael", "fetched_at": 0},      # Config isn't a dict
+        "charlie": ["ai_kael"],
+    }))
+    client = make_client(server, tmp_path)
+    configs = client.fetch(["alpha", "bravo", "charlie"])
+
+    assert server.batches == [["alpha", "bravo", "charlie"]]
+    assert configs["alpha"]["voice_type"] == "ai_kael"
+    client.close()
+
+
+def test_ignores_cache_file_that_is_not_an_object(server, tmp_path):
+    (tmp_path / "cache.json").write_text("[1, 2, 3]")
+    client = make_client(server, tmp_path)
+    assert client.fetch(["alpha"]).keys() == {"alpha"}
+    client.close()
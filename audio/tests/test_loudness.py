@@ -0,0 +1,83 @@
+"""Level meters and the true-peak limiter on synthetic signals."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy.signal import lfilter, resample_poly
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from loudness import LoudnessMeter, PeakMeter, TruePeakLimiter
+
+SR = 8000
+
+
+def sine(freq, seconds, amplitude, sr=SR):
+    return amplitude * np.sin(2 * np.pi * freq * np.arange(int(seconds * sr)) / sr)
+
+
+def true_peak(audio):
+    """Reference true peak: 16x oversampling, independent of the limiter's interpolator."""
+    return float(np.max(np.abs(resample_poly(np.asarray(audio, dtype=np.float64), 16, 1))))
+
+
+def test_peak_meter_matches_whole_buffer_and_hits_target():
+    audio = np.random.default_rng(1).standard_normal(10_000).astype(np.float32)
+    meter = PeakMeter()
+    for start in range(0, len(audio), 999):
+        meter.update(audio[start:start + 999])
+
+    assert meter.peak == float(np.max(np.abs(audio)))
+    assert np.max(np.abs(audio * meter.gain(0.9))) == pytest.approx(0.9)
+    assert PeakMeter().gain(0.9) == 1.0
+
+
+def test_loudness_of_reference_sine():
+    # BS.1770: a 0 dBFS 997 Hz sine reads -3.01 LUFS, so -20 dBFS reads -23.01
+    sr = 48000
+    meter = LoudnessMeter(sr)
+    meter.update(sine(997, 5, 10 ** (-20 / 20), sr))
+    assert meter.integrated() == pytest.approx(-23.01, abs=0.1)
+
+
+def test_loudness_is_block_size_invariant_and_gain_hits_target():
+    audio = sine(440, 4, 0.3) + np.random.default_rng(2).standard_normal(4 * SR) * 0.05
+    whole = LoudnessMeter(SR)
+    whole.update(audio)
+    blocked = LoudnessMeter(SR)
+    for start in range(0, len(audio), 1234):
+        blocked.update(audio[start:start + 1234])
+    assert blocked.integrated() == pytest.approx(whole.integrated(), abs=1e-9)
+
+    again = LoudnessMeter(SR)
+    again.update(audio * whole.gain(-16.0))
+    assert again.integrated() == pytest.approx(-16.0, abs=1e-6)
+
+
+def test_loudness_of_silence():
+    meter = LoudnessMeter(SR)
+    meter.update(np.zeros(SR))
+    assert meter.integrated() == float("-inf")
+    assert meter.gain(-16.0) == 1.0
+
+
+@pytest.mark.parametrize("color", ["white", "blue", "red"])
+@pytest.mark.parametrize("gain", [2.0, 6.0])
+def test_limiter_holds_broadband_noise_under_ceiling(color, gain):
+    noise = np.random.default_rng(7).standard_normal(SR * 5) * 0.3
+    if color == "blue":     # Most energy near Nyquist, where inter-sample peaks are largest
+        noise = np.diff(noise, prepend=0.0)
+    elif color == "red":
+        noise = lfilter([0.3], [1.0, -0.9], noise)
+    audio = noise.astype(np.float32)
+
+    TruePeakLimiter(SR, -1.0).apply(audio, gain, block_size=3000)
+
+    assert 20 * np.log10(true_peak(audio)) <= -1.0
+
+
+def test_limiter_is_block_size_invariant():
+    noise = (np.random.default_rng(3).standard_normal(SR * 3) * 0.5).astype(np.float32)
+    whole = TruePeakLimiter(SR).apply(noise.copy(), 3.0, block_size=len(noise))
+    blocked = TruePeakLimiter(SR).apply(noise.copy(), 3.0, block_size=777)
+    np.testing.assert_allclose(blocked, whole, atol=1e-6)
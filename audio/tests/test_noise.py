@@ -0,0 +1,77 @@
+"""Noise bed looping and NoiseMixer reproducibility."""
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from noise import NoiseLibrary, NoiseMixer, mix_loop, parse_noise_spec, seamless_loop
+
+SR = 8000
+
+
+def bed(seed, n=1000):
+    return np.random.default_rng(seed).uniform(-1, 1, n).astype(np.float32)
+
+
+def test_seamless_loop_crossfades_tail_into_head():
+    samples = bed(0)
+    loop = seamless_loop(samples, 100)
+
+    assert len(loop) == len(samples) - 100
+    np.testing.assert_array_equal(loop[100:], samples[100:900])
+    # The head starts as the sample after the loop's end and ends as the recording's head
+    assert loop[0] == pytest.approx(samples[900], abs=0.01)
+    assert loop[99] == pytest.approx(samples[99], abs=0.01)
+
+
+def test_mix_loop_wraps_and_continues_across_blocks():
+    loop = bed(1, 300)
+    whole = np.zeros(1000, dtype=np.float32)
+    end = mix_loop(whole, loop, 0.5, offset=250)
+
+    np.testing.assert_allclose(whole, 0.5 * np.roll(np.tile(loop, 4), -250)[:1000], atol=1e-7)
+    assert end == (250 + 1000) % 300
+
+    blocked = np.zeros(1000, dtype=np.float32)
+    offset = 250
+    for start in range(0, 1000, 170):
+        offset = mix_loop(blocked[start:start + 170], loop, 0.5, offset)
+    np.testing.assert_allclose(blocked, whole, atol=1e-7)
+
+
+def test_mixer_is_reproducible_from_seed_and_reset():
+    beds = [(bed(2), 0.02), (bed(3, 700), 0.01)]
+    first = NoiseMixer(beds, random.Random(9)).mix(np.zeros(5000, dtype=np.float32))
+    second = NoiseMixer(beds, random.Random(9)).mix(np.zeros(5000, dtype=np.float32))
+    np.testing.assert_array_equal(first, second)
+
+    mixer = NoiseMixer(beds, random.Random(9))
+    for start in range(0, 5000, 333):
+        mixer.mix(np.zeros(333, dtype=np.float32))
+    mixer.reset()
+    np.testing.assert_array_equal(mixer.mix(np.zeros(5000, dtype=np.float32)), first)
+
+    assert np.max(np.abs(first)) <= mixer.peak
+
+
+def test_parse_noise_spec():
+    assert parse_noise_spec("fan+white_noise:0.005", 0.01, {"fan": 0.02}) == [("fan", 0.02), ("white_noise", 0.005)]
+    assert parse_noise_spec("none", 0.01) == []
+    assert parse_noise_spec(None, 0.01) == []
+
+
+def test_library_skips_missing_beds(tmp_path):
+    sf.write(tmp_path / "fan.wav", bed(4, 4000), SR)
+    library = NoiseLibrary(str(tmp_path), SR, crossfade_seconds=0.05, extension=".wav")
+
+    assert len(library.loop("fan")) == 4000 - 400
+    assert library.loop("fan") is library.loop("fan")
+    assert library.loop("missing") is None
+    assert library.mixer("fan+missing", 0.01)
+    assert not library.mixer("missing", 0.01)
+    assert not library.mixer("none", 0.01)
+    assert NoiseMixer([]).peak == pytest.approx(0.0)
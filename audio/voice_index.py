@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Per-run directory indexes of voice profiles, so clip picks don't relist folders."""
+import os
+import random
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+AUDIO_EXTENSIONS = frozenset({'.mp3', '.wav', '.ogg', '.flac'})
+
+
+def _scan_category(folder: str, extensions: FrozenSet[str]) -> Dict[str, str]:
+    """Map clip filename -> full path for the audio files directly in `folder`."""
+    clips = {}
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions:
+                clips[entry.name] = entry.path
+    return clips
+
+
+class VoiceIndex:
+    """Category -> clip paths for a single voice profile folder."""
+
+    def __init__(self, voice_dir: str, extensions: FrozenSet[str] = AUDIO_EXTENSIONS):
+        self.voice_dir = str(voice_dir)
+        self.extensions = frozenset(e.lower() for e in extensions)
+        self._by_name: Dict[str, Dict[str, str]] = {}
+        self._paths: Dict[str, List[str]] = {}
+
+        if os.path.isdir(self.voice_dir):
+            with os.scandir(self.voice_dir) as it:
+                for entry in it:
+                    if entry.is_dir() and not entry.name.startswith("."):
+                        clips = _scan_category(entry.path, self.extensions)
+                        self._by_name[entry.name] = clips
+                        self._paths[entry.name] = sorted(clips.values())
+
+    def categories(self) -> List[str]:
+        return sorted(self._paths)
+
+    def clips(self, category: str) -> List[str]:
+        """All clip paths in `category` (empty if the folder is missing)."""
+        return self._paths.get(category, [])
+
+    def names(self, category: str) -> Dict[str, str]:
+        """Clip filename -> path for `category`."""
+        return self._by_name.get(category, {})
+
+    def choice(self, category: str, rng: random.Random = random) -> Optional[str]:
+        clips = self._paths.get(category)
+        return rng.choice(clips) if clips else None
+
+    def __len__(self) -> int:
+        return sum(len(c) for c in self._paths.values())
+
+
+class PairIndex:
+    """Category -> clips present under the same filename in two voice profiles."""
+
+    def __init__(self, first: VoiceIndex, second: VoiceIndex):
+        self._pairs: Dict[str, List[Tuple[str, str]]] = {}
+        for category in set(first.categories()) & set(second.categories()):
+            a, b = first.names(category), second.names(category)
+            matching = sorted(a.keys() & b.keys())
+            if matching:
+                self._pairs[category] = [(a[name], b[name]) for name in matching]
+
+    def pairs(self, category: str) -> List[Tuple[str, str]]:
+        return self._pairs.get(category, [])
+
+    def choice(self, category: str, rng: random.Random = random) -> Optional[Tuple[str, str]]:
+        pairs = self._pairs.get(category)
+        return rng.choice(pairs) if pairs else None
+
+
+@lru_cache(maxsize=None)
+def get_voice_index(voice_dir: str, extensions: FrozenSet[str] = AUDIO_EXTENSIONS) -> VoiceIndex:
+    """Run-wide VoiceIndex for `voice_dir`, scanned on first use."""
+    return VoiceIndex(voice_dir, extensions)
+
+
+@lru_cache(maxsize=None)
+def get_pair_index(first_dir: str, second_dir: str, extensions: FrozenSet[str] = AUDIO_EXTENSIONS) -> PairIndex:
+    """Run-wide PairIndex for two voice folders, scanned on first use."""
+    return PairIndex(get_voice_index(first_dir, extensions), get_voice_index(second_dir, extensions))
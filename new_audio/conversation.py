@@ -1,14 +1,24 @@
-import time
 import random
 import os
 import numpy as np
-import librosa
 import soundfile as sf
 import uuid
 import sys
 import argparse
+import traceback
 from datetime import datetime
 
+# Shared clip/voice helpers live next to the single-speaker generator in ../audio
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "audio"))
+from voice_index import get_pair_index, get_voice_index
+from pair_bank import PairBank
+from conversation_engine import ConversationEngine, LineBank, TurnSettings
+from multitrack import MultiTrackBuffer
+from clip_cache import ClipCache
+from effects import EffectChain
+from scheduler import JobScheduler
+from seeding import job_seeds, new_seed, seed_metadata
+
 accounts = [
   {
     "username": "botfrag666",
@@ -38,6 +48,7 @@ OUTPUT_ROOT = os.path.join(BASE_DIR, "output_conversation")
 # User directories
 USER1_DIR = os.path.join(BASE_DIR, "ai_kael")  # Initiator
 USER2_DIR = os.path.join(BASE_DIR, "bren")     # Responder
+CLIP_EXTENSIONS = frozenset({".mp3"})
 
 # ==========================
 # Audio Settings
@@ -53,6 +64,22 @@ EXTRA_DURATION_MAX = 15 * 60
 RESPONSE_TIME_MIN = 0.5  # Minimum delay before response (seconds)
 RESPONSE_TIME_MAX = 2.0  # Maximum delay before response (seconds)
 
+# Group conversations (--group): turn-taking between any number of speakers
+JOIN_PROBABILITY = 0.6  # Chance each other speaker with the same line answers it
+OVERLAP_PROBABILITY = 0.15  # Chance an answer starts before the previous turn ends
+OVERLAP_MIN = 0.2  # Overlap range (seconds)
+OVERLAP_MAX = 0.8
+INTERRUPT_PROBABILITY = 0.1  # Chance an answer cuts the previous turn short
+INTERRUPT_AT_MIN = 0.4  # Fraction of the interrupted clip that still plays
+INTERRUPT_AT_MAX = 0.8
+INTERRUPT_FADE_SECONDS = 0.05  # Fade-out of an interrupted clip
+TURN_SETTINGS = TurnSettings(
+    response_min=RESPONSE_TIME_MIN, response_max=RESPONSE_TIME_MAX, join_chance=JOIN_PROBABILITY,
+    overlap_chance=OVERLAP_PROBABILITY, overlap_min=OVERLAP_MIN, overlap_max=OVERLAP_MAX,
+    interrupt_chance=INTERRUPT_PROBABILITY, interrupt_min=INTERRUPT_AT_MIN, interrupt_max=INTERRUPT_AT_MAX,
+    interrupt_fade=INTERRUPT_FADE_SECONDS,
+)
+
 # Pause between conversation exchanges
 EXCHANGE_PAUSE_MIN = 1.0  # Minimum pause after user2 responds
 EXCHANGE_PAUSE_MAX = 3.0  # Maximum pause after user2 responds
@@ -60,6 +87,16 @@ EXCHANGE_PAUSE_MAX = 3.0  # Maximum pause after user2 responds
 # Audio Mixing Settings
 PEAK_NORMALIZATION = 0.9  # Peak normalization level (0.0-1.0)
 FINAL_PEAK_NORMALIZATION = 0.95  # Final peak normalization after mixing
+MIC_COLOR_COEF = 0.93  # Mic coloring pre-emphasis coefficient
+CLIP_CACHE_BYTES = 256 * 1024 * 1024  # Decoded, mic_color'd clips kept in RAM per process
+
+# Output Settings
+CONVERSATION_OUTPUT = "tracks"  # "tracks" (one mono WAV per speaker) or "interleaved" (one WAV, a channel per speaker)
+WRITE_BLOCK_SECONDS = 30  # Interleaved files are written from the shared buffer in blocks of this size
+
+# Parallel Settings
+USE_MULTIPROCESSING = True  # Render initiator/respondent pairs in a worker pool
+MAX_WORKERS = None  # Worker processes (None = from CPU count and free memory)
 
 # ==========================
 # ROUND SEQUENCE (from main.py)
@@ -92,166 +129,185 @@ PLAY_PROBABILITY = {
 # VOICE FX
 # ==========================
 
-def mic_color(audio):
-    """Apply mic coloring effect to audio"""
-    return librosa.effects.preemphasis(audio, coef=0.93)
+effects = EffectChain()  # One scratch buffer reused for every clip in this process
+
+clip_cache = ClipCache(max_bytes=CLIP_CACHE_BYTES)
+
+def load_clip(path):
+    """Decoded + mic_color'd once per process (read-only, shared)"""
+    return clip_cache.get(path, SR, preemphasis=MIC_COLOR_COEF)
+
+def normalize_clip(clip):
+    """Copy of a cached clip peak-normalized to PEAK_NORMALIZATION"""
+    audio = np.array(clip)
+    peak = np.max(np.abs(audio))
+    if peak > 0:
+        effects.apply(audio, gain=PEAK_NORMALIZATION / peak)
+    return audio
+
+prepared_clips = {}  # path -> mic_color'd, normalized clip, shared by every pair bank
+pair_banks = {}  # (user1_dir, user2_dir) -> PairBank
+line_banks = {}  # (voice_dir, ...) -> LineBank
+
+def prepare_clip(path):
+    """Mic_color'd + normalized clip, processed once per run"""
+    audio = prepared_clips.get(path)
+    if audio is None:
+        audio = prepared_clips[path] = normalize_clip(load_clip(path))
+    return audio
 
 # ==========================
 # CORE FUNCTIONS
 # ==========================
 
-def get_matching_files(category, user1_dir, user2_dir):
+def get_pair_bank(user1_dir, user2_dir):
     """
-    Get matching audio files from both users for a given category.
-    Returns list of tuples: [(user1_file_path, user2_file_path), ...]
+    Matching clips of both users for every category, ready to write.
+    Built on first use; later calls are lookups.
     """
-    user1_folder = os.path.join(user1_dir, category)
-    user2_folder = os.path.join(user2_dir, category)
-    
-    if not os.path.exists(user1_folder) or not os.path.exists(user2_folder):
-        return []
-    
-    user1_files = {f for f in os.listdir(user1_folder) if f.endswith(".mp3")}
-    user2_files = {f for f in os.listdir(user2_folder) if f.endswith(".mp3")}
-    
-    # Find matching filenames
-    matching_files = user1_files.intersection(user2_files)
-    
-    if not matching_files:
-        return []
-    
-    return [
-        (os.path.join(user1_folder, f), os.path.join(user2_folder, f))
-        for f in matching_files
-    ]
+    key = (user1_dir, user2_dir)
+    if key not in pair_banks:
+        index = get_pair_index(user1_dir, user2_dir, CLIP_EXTENSIONS)
+        pair_banks[key] = PairBank.build(index, sorted(set(ROUND_SEQUENCE)), prepare_clip, SR)
+        clip_cache.clear()  # Processed copies now live in the bank
+    return pair_banks[key]
+
+def get_line_bank(voice_dirs):
+    """
+    Lines shared by at least two of the voices, one clip per voice that has them.
+    Built on first use; later calls are lookups.
+    """
+    key = tuple(voice_dirs)
+    if key not in line_banks:
+        voices = [get_voice_index(voice_dir, CLIP_EXTENSIONS) for voice_dir in key]
+        line_banks[key] = LineBank.build(voices, sorted(set(ROUND_SEQUENCE)), prepare_clip)
+        clip_cache.clear()  # Processed copies now live in the bank
+    return line_banks[key]
 
 def add_silence(seconds, state):
     """Add silence to the audio state"""
-    silence = np.zeros(int(seconds * SR))
-    state["audio"] = np.concatenate([state["audio"], silence])
+    state["audio"].silence(int(seconds * SR))
 
-def play_conversation_exchange(category, state_user1, state_user2, user1_dir, user2_dir):
+def play_conversation_exchange(category, state_user1, state_user2, user1_dir, user2_dir, rng=random):
     """
     Play a conversation exchange for both users:
     User1: speaks, then silence for user2's response duration
     User2: silence for user1's speech duration, then speaks
     """
-    matching_files = get_matching_files(category, user1_dir, user2_dir)
+    pair = get_pair_bank(user1_dir, user2_dir).choice(category, rng)
     
-    if not matching_files:
+    if pair is None:
         return False
     
-    # Select a random matching pair
-    user1_file, user2_file = random.choice(matching_files)
+    # Add response delays
+    response_delay = rng.uniform(RESPONSE_TIME_MIN, RESPONSE_TIME_MAX)
     
-    # Load both audio files
-    try:
-        audio1, _ = librosa.load(user1_file, sr=SR)
-        audio1 = mic_color(audio1)
-        
-        # Apply normalization
-        peak = np.max(np.abs(audio1))
-        if peak > 0:
-            audio1 = audio1 / peak * PEAK_NORMALIZATION
-        
-        audio2, _ = librosa.load(user2_file, sr=SR)
-        audio2 = mic_color(audio2)
-        
-        # Apply normalization
-        peak = np.max(np.abs(audio2))
-        if peak > 0:
-            audio2 = audio2 / peak * PEAK_NORMALIZATION
-        
-        # Get durations
-        duration1 = len(audio1) / SR
-        duration2 = len(audio2) / SR
-        
-        # Add response delays
-        response_delay = random.uniform(RESPONSE_TIME_MIN, RESPONSE_TIME_MAX)
-        
-        # User1 track: speaks, then silence for user2's response
-        state_user1["audio"] = np.concatenate([state_user1["audio"], audio1])
-        add_silence(response_delay, state_user1)
-        add_silence(duration2, state_user1)
-        
-        # User2 track: silence for user1's speech, then speaks
-        add_silence(duration1, state_user2)
-        add_silence(response_delay, state_user2)
-        state_user2["audio"] = np.concatenate([state_user2["audio"], audio2])
-        
-        return True
-        
-    except Exception as e:
-        print(f"[WARNING] Error playing conversation exchange from {category}: {e}")
-        return False
+    # User1 track: speaks, then silence for user2's response
+    state_user1["audio"].write(pair.first)
+    add_silence(response_delay, state_user1)
+    add_silence(pair.second_seconds, state_user1)
+    
+    # User2 track: silence for user1's speech, then speaks
+    add_silence(pair.first_seconds, state_user2)
+    add_silence(response_delay, state_user2)
+    state_user2["audio"].write(pair.second)
+    
+    return True
 
 # ==========================
 # CONVERSATION GENERATION
 # ==========================
 
-def generate_conversation(state_user1, state_user2, user1_dir, user2_dir):
+def exchange_pause(rng=random):
+    """Pause after an exchange (mimic main.py pacing)"""
+    r = rng.random()
+    if r < 0.5:
+        return rng.uniform(0.05, 0.3)
+    elif r < 0.9:
+        return rng.uniform(0.4, 1.2)
+    return rng.uniform(2.5, 5.0)
+
+def generate_conversation(state_user1, state_user2, user1_dir, user2_dir, rng=random):
     """Generate a full conversation sequence for both users following the round order"""
     # Iterate through the round sequence in order
     for category in ROUND_SEQUENCE:
         # Check probability
-        if random.random() > PLAY_PROBABILITY.get(category, 1.0):
+        if rng.random() > PLAY_PROBABILITY.get(category, 1.0):
             continue
         
         # Play conversation exchange
-        success = play_conversation_exchange(category, state_user1, state_user2, user1_dir, user2_dir)
+        success = play_conversation_exchange(category, state_user1, state_user2, user1_dir, user2_dir, rng)
         
         if success:
-            # Add pause after the exchange to both tracks (mimic main.py pacing)
-            r = random.random()
-            if r < 0.5:
-                pause = random.uniform(0.05, 0.3)
-            elif r < 0.9:
-                pause = random.uniform(0.4, 1.2)
-            else:
-                pause = random.uniform(2.5, 5.0)
+            # Add pause after the exchange to both tracks
+            pause = exchange_pause(rng)
             add_silence(pause, state_user1)
             add_silence(pause, state_user2)
 
+def generate_group_conversation(conversation, engine, clock):
+    """One round sequence across every speaker of the group, from frame `clock`. Returns the new clock"""
+    rng = engine.rng
+    for category in ROUND_SEQUENCE:
+        if rng.random() > PLAY_PROBABILITY.get(category, 1.0):
+            continue
+        
+        end = engine.exchange(category, conversation, clock)
+        if end is not None:
+            clock = end + int(exchange_pause(rng) * SR)
+    return clock
+
 # ==========================
 # AUDIO JOB
 # ==========================
 
-def generate_conversation_audio(version):
-    """Generate two conversation audio files (one for each user)"""
+def tag_seed(f, seed):
+    """Record the conversation's seed in an open SoundFile's comment tag"""
+    if seed is not None:
+        for key, value in seed_metadata(seed).items():
+            setattr(f, key, value)
+
+def save_tracks(conversation, paths, seed=None):
+    """Write each channel of `conversation` to its own mono WAV (None skips a channel)"""
+    for channel, path in enumerate(paths):
+        if path is not None:
+            with sf.SoundFile(path, "w", SR, 1) as f:
+                tag_seed(f, seed)
+                f.write(conversation.channel(channel))
+
+def save_interleaved(conversation, path, seed=None):
+    """Write every channel of `conversation` into one multichannel WAV"""
+    with sf.SoundFile(path, "w", SR, conversation.channels) as f:
+        tag_seed(f, seed)
+        for block in conversation.interleaved(int(WRITE_BLOCK_SECONDS * SR)):
+            f.write(block)
+
+def generate_conversation_audio(version, seed=None):
+    """Generate two conversation tracks (one per user file, or one interleaved stereo file)"""
+    # Every random draw comes from one seeded rng, so the seed reproduces the conversation
+    if seed is None:
+        seed = new_seed()
+    rng = random.Random(seed)
+    
+    EXTRA_SECONDS = rng.randint(EXTRA_DURATION_MIN, EXTRA_DURATION_MAX)
+    TARGET_SECONDS = BASE_DURATION_SECONDS + EXTRA_SECONDS
+    
+    # Both tracks live in one 2-channel buffer, so they always end up the same length
+    conversation = MultiTrackBuffer.for_duration(TARGET_SECONDS, SR, 2)
     state_user1 = {
-        "audio": np.array([], dtype=np.float32),
+        "audio": conversation.track(0),
     }
     state_user2 = {
-        "audio": np.array([], dtype=np.float32),
+        "audio": conversation.track(1),
     }
     
-    EXTRA_SECONDS = random.randint(EXTRA_DURATION_MIN, EXTRA_DURATION_MAX)
-    TARGET_SECONDS = BASE_DURATION_SECONDS + EXTRA_SECONDS
-    
-    print(f"[JOB START] Conversation v{version} - Target: {TARGET_SECONDS}s")
+    print(f"[JOB START] Conversation v{version} - Target: {TARGET_SECONDS}s (seed {seed})")
     
     # Keep generating conversation exchanges until target duration is reached
     while len(state_user1["audio"]) / SR < TARGET_SECONDS:
-        generate_conversation(state_user1, state_user2, USER1_DIR, USER2_DIR)
-    
-    audio_user1 = state_user1["audio"]
-    audio_user2 = state_user2["audio"]
-    
-    # Ensure both tracks are the same length (pad the shorter one)
-    max_len = max(len(audio_user1), len(audio_user2))
-    if len(audio_user1) < max_len:
-        audio_user1 = np.pad(audio_user1, (0, max_len - len(audio_user1)), mode='constant')
-    if len(audio_user2) < max_len:
-        audio_user2 = np.pad(audio_user2, (0, max_len - len(audio_user2)), mode='constant')
-    
-    # Final normalization for both tracks
-    peak = np.max(np.abs(audio_user1))
-    if peak > 0:
-        audio_user1 = audio_user1 / peak * FINAL_PEAK_NORMALIZATION
+        generate_conversation(state_user1, state_user2, USER1_DIR, USER2_DIR, rng)
     
-    peak = np.max(np.abs(audio_user2))
-    if peak > 0:
-        audio_user2 = audio_user2 / peak * FINAL_PEAK_NORMALIZATION
+    # Final normalization for both tracks (peaks were tracked while writing)
+    conversation.normalize(FINAL_PEAK_NORMALIZATION)
     
     # Create output directory
     os.makedirs(OUTPUT_ROOT, exist_ok=True)
@@ -259,18 +315,20 @@ def generate_conversation_audio(version):
     # Generate filename with date and unique ID
     date_str = datetime.now().strftime("%Y%m%d")
     unique_id = str(uuid.uuid4())[:8]
+    duration = len(conversation) / SR
     
-    # Save User1 (ai_kael) file
-    file_name_user1 = f"conversation_user1_kael_{date_str}_{unique_id}"
-    out_path_user1 = os.path.join(OUTPUT_ROOT, f"{file_name_user1}.wav")
-    sf.write(out_path_user1, audio_user1, SR)
+    if CONVERSATION_OUTPUT == "interleaved":
+        # User1 (ai_kael) left, User2 (bren) right
+        out_path = os.path.join(OUTPUT_ROOT, f"conversation_stereo_{date_str}_{unique_id}.wav")
+        save_interleaved(conversation, out_path, seed)
+        print(f"[JOB DONE] Stereo: {out_path} - Duration: {duration:.2f}s")
+        return (out_path,)
     
-    # Save User2 (bren) file
-    file_name_user2 = f"conversation_user2_bren_{date_str}_{unique_id}"
-    out_path_user2 = os.path.join(OUTPUT_ROOT, f"{file_name_user2}.wav")
-    sf.write(out_path_user2, audio_user2, SR)
+    # Save User1 (ai_kael) and User2 (bren) files
+    out_path_user1 = os.path.join(OUTPUT_ROOT, f"conversation_user1_kael_{date_str}_{unique_id}.wav")
+    out_path_user2 = os.path.join(OUTPUT_ROOT, f"conversation_user2_bren_{date_str}_{unique_id}.wav")
+    save_tracks(conversation, [out_path_user1, out_path_user2], seed)
     
-    duration = len(audio_user1) / SR
     print(f"[JOB DONE] User1: {out_path_user1} - Duration: {duration:.2f}s")
     print(f"[JOB DONE] User2: {out_path_user2} - Duration: {duration:.2f}s")
     
@@ -284,6 +342,8 @@ def parse_args():
     parser = argparse.ArgumentParser(description="Generate conversation audio files")
     parser.add_argument("--usernames", type=str, nargs="+", help="List of usernames to generate conversations for")
     parser.add_argument("--num-files", type=int, required=False, help="Number of conversation files to generate")
+    parser.add_argument("--group", action="store_true", help="Render all usernames as one group conversation instead of initiator/respondent pairs")
+    parser.add_argument("--seed", type=int, required=False, help="Base seed; conversations get seed, seed+1, ... so a run can be reproduced")
     return parser.parse_args()
 
 
@@ -300,8 +360,91 @@ def get_voice_dir(voice_type):
     return os.path.join(BASE_DIR, "voices", voice_type)
 
 
-def generate_conversations_for_users(usernames, num_files):
-    """Generate conversation audio files for multiple users"""
+def render_conversation_pair(initiator, respondent, file_num, unique_id, save_initiator=True, save_respondent=True,
+                             seed=None):
+    """Render one initiator <-> respondent conversation and save the requested tracks"""
+    # Get voice directories based on voice_type
+    initiator_voice_dir = get_voice_dir(initiator["voice_type"])
+    respondent_voice_dir = get_voice_dir(respondent["voice_type"])
+    
+    if seed is None:
+        seed = new_seed()
+    rng = random.Random(seed)
+    
+    EXTRA_SECONDS = rng.randint(EXTRA_DURATION_MIN, EXTRA_DURATION_MAX)
+    TARGET_SECONDS = BASE_DURATION_SECONDS + EXTRA_SECONDS
+    
+    conversation = MultiTrackBuffer.for_duration(TARGET_SECONDS, SR, 2)
+    state_initiator = {"audio": conversation.track(0)}
+    state_respondent = {"audio": conversation.track(1)}
+    
+    print(f"      • {initiator['username']} <-> {respondent['username']} (Target: {TARGET_SECONDS:.0f}s, seed {seed})")
+    
+    # Keep generating conversation exchanges until target duration is reached
+    while len(state_initiator["audio"]) / SR < TARGET_SECONDS:
+        generate_conversation(state_initiator, state_respondent, initiator_voice_dir, respondent_voice_dir, rng)
+    
+    # Normalize peak levels (peaks were tracked while writing); the shared buffer
+    # already gives both tracks the same length
+    conversation.normalize(FINAL_PEAK_NORMALIZATION)
+    
+    # Save files with numbering format: {number}_{randomkey}.wav
+    filename = f"{file_num}_{unique_id}.wav"
+    paths = [
+        os.path.join(BASE_DIR, "output", account["username"], filename) if save else None
+        for account, save in ((initiator, save_initiator), (respondent, save_respondent))
+    ]
+    save_tracks(conversation, paths, seed)
+    
+    duration = len(conversation) / SR
+    saved = []
+    for account, path in zip((initiator, respondent), paths):
+        if path is not None:
+            print(f"         ✓ {account['username']}: {filename} ({duration:.0f}s)")
+            saved.append(path)
+    
+    return saved
+
+
+def render_group_conversation(group, file_num, unique_id, seed=None):
+    """Render one conversation between every account in `group` and save a track per account"""
+    voice_dirs = [get_voice_dir(account["voice_type"]) for account in group]
+    bank = get_line_bank(voice_dirs)
+    if not len(bank):
+        raise ValueError("the group's voices share no lines")
+    if seed is None:
+        seed = new_seed()
+    rng = random.Random(seed)
+    engine = ConversationEngine(bank, SR, TURN_SETTINGS, rng)
+    
+    EXTRA_SECONDS = rng.randint(EXTRA_DURATION_MIN, EXTRA_DURATION_MAX)
+    TARGET_SECONDS = BASE_DURATION_SECONDS + EXTRA_SECONDS
+    
+    print(f"      • {' <-> '.join(account['username'] for account in group)} (Target: {TARGET_SECONDS:.0f}s, seed {seed})")
+    
+    # One channel per speaker; every exchange writes all of its turns in one pass
+    conversation = MultiTrackBuffer.for_duration(TARGET_SECONDS, SR, len(group))
+    clock = 0
+    while clock / SR < TARGET_SECONDS:
+        clock = generate_group_conversation(conversation, engine, clock)
+    for channel in range(len(group)):
+        conversation.pad_to(channel, clock)
+    
+    conversation.normalize(FINAL_PEAK_NORMALIZATION)
+    
+    # Save files with numbering format: {number}_{randomkey}.wav
+    filename = f"{file_num}_{unique_id}.wav"
+    paths = [os.path.join(BASE_DIR, "output", account["username"], filename) for account in group]
+    save_tracks(conversation, paths, seed)
+    
+    duration = len(conversation) / SR
+    for account in group:
+        print(f"         ✓ {account['username']}: {filename} ({duration:.0f}s)")
+    return paths
+
+
+def generate_conversations_for_users(usernames, num_files, group=False, seed=None):
+    """Generate conversation audio files for multiple users (rendered conversations get seed, seed+1, ...)"""
     # Get account configurations
     accounts_config = []
     for username in usernames:
@@ -315,7 +458,10 @@ def generate_conversations_for_users(usernames, num_files):
     initiators = [acc for acc in accounts_config if acc.get("type") == "initiator"]
     respondents = [acc for acc in accounts_config if acc.get("type") == "respondent"]
     
-    if not initiators or not respondents:
+    if group and len(accounts_config) < 2:
+        print(f"❌ A group conversation needs at least two users. Found {len(accounts_config)}.")
+        return
+    if not group and (not initiators or not respondents):
         print(f"❌ Need at least one initiator and one respondent. Found {len(initiators)} initiators and {len(respondents)} respondents.")
         return
     
@@ -326,76 +472,75 @@ def generate_conversations_for_users(usernames, num_files):
     
     print(f"\n=== Conversation Audio Generator ===")
     print(f"📝 Generating {num_files} conversation(s)")
-    print(f"   Initiators: {[acc['username'] for acc in initiators]}")
-    print(f"   Respondents: {[acc['username'] for acc in respondents]}")
+    if group:
+        print(f"   Group: {[acc['username'] for acc in accounts_config]}")
+        # Build the group's line bank once here so forked workers share it
+        bank = get_line_bank([get_voice_dir(acc["voice_type"]) for acc in accounts_config])
+        print(f"   🧠 {len(accounts_config)} voices: {len(bank)} shared lines")
+    else:
+        print(f"   Initiators: {[acc['username'] for acc in initiators]}")
+        print(f"   Respondents: {[acc['username'] for acc in respondents]}")
+        
+        # Build every pair's clip bank once here so forked workers share it
+        for initiator in initiators:
+            for respondent in respondents:
+                bank = get_pair_bank(get_voice_dir(initiator["voice_type"]), get_voice_dir(respondent["voice_type"]))
+                print(f"   🧠 {initiator['voice_type']} <-> {respondent['voice_type']}: {len(bank)} pairs")
+    
+    # Every pair of a file number saves to {file_num}_{unique_id}.wav, so a user's
+    # file is the one from their last pair in the matrix (as when rendered in
+    # order); only that pair saves it, and pairs saving nothing are skipped
+    pairs = []
+    if not group:
+        for initiator in initiators:
+            for respondent in respondents:
+                save_initiator = respondent is respondents[-1]
+                save_respondent = initiator is initiators[-1]
+                if save_initiator or save_respondent:
+                    pairs.append((initiator, respondent, save_initiator, save_respondent))
     
-    for file_num in range(1, num_files + 1):
-        try:
+    # One seed per rendered conversation, assigned in submission order
+    seeds = iter(job_seeds(num_files * (1 if group else len(pairs)), seed))
+    
+    # Each worker keeps its own clip cache across the conversations it renders
+    scheduler = JobScheduler(MAX_WORKERS) if USE_MULTIPROCESSING else None
+    try:
+        jobs = []
+
+        for file_num in range(1, num_files + 1):
             # Generate unique ID for this conversation pair
             unique_id = str(uuid.uuid4())[:6]
-            
+
             print(f"\n   [{file_num}/{num_files}] Conversation ID: {unique_id}")
-            
-            # Generate conversation for each initiator-respondent pair
-            for initiator in initiators:
-                for respondent in respondents:
-                    state_initiator = {"audio": np.array([], dtype=np.float32)}
-                    state_respondent = {"audio": np.array([], dtype=np.float32)}
-                    
-                    # Get voice directories based on voice_type
-                    initiator_voice_dir = get_voice_dir(initiator["voice_type"])
-                    respondent_voice_dir = get_voice_dir(respondent["voice_type"])
-                    
-                    EXTRA_SECONDS = random.randint(EXTRA_DURATION_MIN, EXTRA_DURATION_MAX)
-                    TARGET_SECONDS = BASE_DURATION_SECONDS + EXTRA_SECONDS
-                    
-                    print(f"      • {initiator['username']} <-> {respondent['username']} (Target: {TARGET_SECONDS:.0f}s)")
-                    
-                    # Keep generating conversation exchanges until target duration is reached
-                    while len(state_initiator["audio"]) / SR < TARGET_SECONDS:
-                        generate_conversation(state_initiator, state_respondent, initiator_voice_dir, respondent_voice_dir)
-                    
-                    audio_initiator = state_initiator["audio"]
-                    audio_respondent = state_respondent["audio"]
-                    
-                    # Ensure both tracks are the same length (pad the shorter one)
-                    max_len = max(len(audio_initiator), len(audio_respondent))
-                    if len(audio_initiator) < max_len:
-                        audio_initiator = np.pad(audio_initiator, (0, max_len - len(audio_initiator)))
-                    if len(audio_respondent) < max_len:
-                        audio_respondent = np.pad(audio_respondent, (0, max_len - len(audio_respondent)))
-                    
-                    # Normalize peak levels
-                    peak = np.max(np.abs(audio_initiator))
-                    if peak > 0:
-                        audio_initiator = audio_initiator / peak * FINAL_PEAK_NORMALIZATION
-                    
-                    peak = np.max(np.abs(audio_respondent))
-                    if peak > 0:
-                        audio_respondent = audio_respondent / peak * FINAL_PEAK_NORMALIZATION
-                    
-                    # Save files with numbering format: {number}_{randomkey}.wav
-                    initiator_filename = f"{file_num}_{unique_id}.wav"
-                    respondent_filename = f"{file_num}_{unique_id}.wav"
-                    
-                    initiator_output_dir = os.path.join(BASE_DIR, "output", initiator["username"])
-                    respondent_output_dir = os.path.join(BASE_DIR, "output", respondent["username"])
-                    
-                    initiator_path = os.path.join(initiator_output_dir, initiator_filename)
-                    respondent_path = os.path.join(respondent_output_dir, respondent_filename)
-                    
-                    # Save audio files
-                    sf.write(initiator_path, audio_initiator, SR)
-                    sf.write(respondent_path, audio_respondent, SR)
-                    
-                    duration = len(audio_initiator) / SR
-                    print(f"         ✓ {initiator['username']}: {initiator_filename} ({duration:.0f}s)")
-                    print(f"         ✓ {respondent['username']}: {respondent_filename} ({duration:.0f}s)")
-        
-        except Exception as e:
-            print(f"        ✗ Error generating conversation {file_num}: {e}")
-            import traceback
-            traceback.print_exc()
+
+            if group:
+                args = (accounts_config, file_num, unique_id, next(seeds))
+                if scheduler:
+                    jobs.append((file_num, scheduler.submit(render_group_conversation, *args)))
+                else:
+                    jobs.append((file_num, (render_group_conversation, args)))
+                continue
+
+            for initiator, respondent, save_initiator, save_respondent in pairs:
+                args = (initiator, respondent, file_num, unique_id, save_initiator, save_respondent, next(seeds))
+                if scheduler:
+                    jobs.append((file_num, scheduler.submit(render_conversation_pair, *args)))
+                else:
+                    jobs.append((file_num, (render_conversation_pair, args)))
+
+        for file_num, job in jobs:
+            try:
+                if scheduler:
+                    job.result()
+                else:
+                    render, args = job
+                    render(*args)
+            except Exception as e:
+                print(f"        ✗ Error generating conversation {file_num}: {e}")
+                traceback.print_exc()
+    finally:
+        if scheduler:
+            scheduler.shutdown()
     
     print(f"\n✅ All conversation audio generation completed!")
     for account in accounts_config:
@@ -408,10 +553,11 @@ if __name__ == "__main__":
     
     if args.usernames and args.num_files:
         # Generate conversations for specified usernames
-        generate_conversations_for_users(args.usernames, args.num_files)
+        generate_conversations_for_users(args.usernames, args.num_files, group=args.group, seed=args.seed)
     elif args.usernames or args.num_files:
         print("❌ Both --usernames and --num-files are required when using command-line arguments.")
         print("   Example: python conversation.py --usernames botfrag666 jeroam --num-files 3")
+        print("   Group:   python conversation.py --usernames botfrag666 jeroam p3 p4 p5 --num-files 3 --group")
         sys.exit(1)
     else:
         # Default behavior if no arguments provided
@@ -420,8 +566,8 @@ if __name__ == "__main__":
         print(f"User 2 (Responder): bren")
         print(f"Generating {AUDIOS_TO_GENERATE} conversation(s)...\n")
         
-        for v in range(1, AUDIOS_TO_GENERATE + 1):
-            generate_conversation_audio(v)
+        for v, seed in enumerate(job_seeds(AUDIOS_TO_GENERATE, args.seed), start=1):
+            generate_conversation_audio(v, seed)
         
         print("\n✅ All conversation audio generation completed.")
 
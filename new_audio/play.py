@@ -15,11 +15,13 @@ except ImportError:
 OUTPUT_DIR = Path(__file__).parent / "output_conversation"
 USER1_PATTERN = re.compile(r"conversation_user1_kael_(.+)\.wav", re.IGNORECASE)
 USER2_PATTERN = re.compile(r"conversation_user2_bren_(.+)\.wav", re.IGNORECASE)
+STEREO_GLOB = "conversation_stereo_*.wav"
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Play the two conversation WAVs in sync")
     parser.add_argument("--user1", type=Path, help="Path to user1 (kael) wav")
     parser.add_argument("--user2", type=Path, help="Path to user2 (bren) wav")
+    parser.add_argument("--file", type=Path, help="Path to an interleaved conversation wav (one channel per speaker)")
     return parser.parse_args()
 
 
@@ -42,52 +44,76 @@ def find_latest_pair():
     return None
 
 
-def load_mono(path: Path):
-    audio, sr = sf.read(path, always_2d=False)
-    if audio.ndim > 1:
-        audio = audio.mean(axis=1)
-    audio = audio.astype(np.float32)
+def find_latest_interleaved():
+    if not OUTPUT_DIR.exists():
+        return None
+    files = sorted(OUTPUT_DIR.glob(STEREO_GLOB), key=lambda p: p.stat().st_mtime, reverse=True)
+    return files[0] if files else None
+
+
+def load_pair(path1: Path, path2: Path):
+    """Both files as the left/right channels of one preallocated stereo buffer"""
+    info1, info2 = sf.info(str(path1)), sf.info(str(path2))
+    if info1.samplerate != info2.samplerate:
+        print(f"Sample rate mismatch: {info1.samplerate} vs {info2.samplerate}")
+        sys.exit(1)
+
+    # The shorter file just ends in the buffer's zeros, so nothing is padded or stacked
+    stereo = np.zeros((max(info1.frames, info2.frames), 2), dtype=np.float32)
+    for channel, path in enumerate((path1, path2)):
+        audio, _ = sf.read(path, dtype="float32", always_2d=True)
+        stereo[:len(audio), channel] = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return stereo, info1.samplerate
+
+
+def load_interleaved(path: Path):
+    """A conversation file with a channel per speaker, folded to stereo if it has more than two"""
+    audio, sr = sf.read(path, dtype="float32", always_2d=True)
+    if audio.shape[1] == 1:
+        audio = np.repeat(audio, 2, axis=1)
+    elif audio.shape[1] > 2:
+        # Alternate speakers between left and right
+        audio = np.stack([audio[:, 0::2].sum(axis=1), audio[:, 1::2].sum(axis=1)], axis=1)
     return audio, sr
 
 
 def main():
     args = parse_args()
 
+    interleaved, pair = args.file, None
     if args.user1 and args.user2:
-        path1, path2 = args.user1, args.user2
-    else:
+        pair = args.user1, args.user2
+    elif not interleaved:
+        # Whichever conversation was written last: an interleaved file or a per-user pair
         pair = find_latest_pair()
-        if not pair:
-            print("No matching pair found in output_conversation. Provide --user1 and --user2.")
+        latest = find_latest_interleaved()
+        if latest and (not pair or latest.stat().st_mtime > pair[0].stat().st_mtime):
+            interleaved, pair = latest, None
+            print(f"Using latest conversation:\n  {interleaved}")
+        elif pair:
+            print(f"Using latest pair:\n  user1: {pair[0]}\n  user2: {pair[1]}")
+        else:
+            print("No conversation found in output_conversation. Provide --user1 and --user2, or --file.")
             sys.exit(1)
-        path1, path2 = pair
-        print(f"Using latest pair:\n  user1: {path1}\n  user2: {path2}")
 
-    if not path1.exists() or not path2.exists():
-        print("One or both files do not exist.")
-        sys.exit(1)
-
-    audio1, sr1 = load_mono(path1)
-    audio2, sr2 = load_mono(path2)
-
-    if sr1 != sr2:
-        print(f"Sample rate mismatch: {sr1} vs {sr2}")
-        sys.exit(1)
-
-    max_len = max(len(audio1), len(audio2))
-    if len(audio1) < max_len:
-        audio1 = np.pad(audio1, (0, max_len - len(audio1)))
-    if len(audio2) < max_len:
-        audio2 = np.pad(audio2, (0, max_len - len(audio2)))
+    if interleaved:
+        if not interleaved.exists():
+            print("File does not exist.")
+            sys.exit(1)
+        stereo, sr = load_interleaved(interleaved)
+    else:
+        if not pair[0].exists() or not pair[1].exists():
+            print("One or both files do not exist.")
+            sys.exit(1)
+        stereo, sr = load_pair(*pair)
 
-    stereo = np.column_stack([audio1, audio2]).astype(np.float32)
     peak = np.max(np.abs(stereo))
     if peak > 1.0:
-        stereo = stereo / peak * 0.99
+        stereo /= peak / 0.99
 
-    dur_sec = max_len / sr1
+    dur_sec = len(stereo) / sr
     print(f"Playing stereo mix for {dur_sec/60:.2f} minutes...")
-    sd.play(stereo, sr1)
+    sd.play(stereo, sr)
     sd.wait()
     print("Done.")
 
@@ -0,0 +1,117 @@
+import path from "path";
+import { spawn } from "child_process";
+import { logPythonOutput } from "../utils.js";
+
+// ===========================
+// AUDIO GENERATOR WORKER
+// ===========================
+// One long-lived `audio_generator_improved.py --worker` process serves every
+// generation job, so Python imports, voice indexes and clip caches stay warm.
+
+const PYTHON_SCRIPT = path.join(
+  process.cwd(),
+  "..",
+  "audio",
+  "audio_generator_improved.py",
+);
+
+// A job that produces no result within this long per requested file is
+// failed and the worker is restarted, so a hung process can't stall requests
+const JOB_TIMEOUT_PER_FILE_MS = 10 * 60 * 1000;
+
+let worker = null;
+let nextJobId = 1;
+const pendingJobs = new Map();
+
+function settleJob(id) {
+  const job = pendingJobs.get(id);
+  if (!job) return null;
+
+  clearTimeout(job.timer);
+  pendingJobs.delete(id);
+  return job;
+}
+
+function handleWorkerEvent(event) {
+  if (event.event !== "result") return;
+
+  const job = settleJob(event.id);
+  if (!job) return;
+
+  event.ok ? job.resolve(event.files) : job.reject(new Error(event.error));
+}
+
+// Reject every job still waiting on the `python` process
+function failPendingJobs(python, error) {
+  for (const [id, job] of [...pendingJobs]) {
+    if (job.worker === python) settleJob(id).reject(error);
+  }
+}
+
+function handleWorkerFailure(python, error) {
+  if (worker === python) worker = null;
+  failPendingJobs(python, error);
+}
+
+function startWorker() {
+  console.log(`Starting audio worker: python ${PYTHON_SCRIPT} --worker`);
+
+  const python = spawn("python", [PYTHON_SCRIPT, "--worker"], {
+    env: { ...process.env, PYTHONIOENCODING: "utf-8" },
+  });
+
+  // Only hand complete lines to the event parser
+  let partial = "";
+  python.stdout.on("data", (d) => {
+    const lines = (partial + d.toString()).split(/\r?\n/);
+    partial = lines.pop();
+    logPythonOutput(lines.join("\n"), handleWorkerEvent);
+  });
+  python.stderr.on("data", (d) =>
+    console.error(`[Python]: ${d.toString().trim()}`),
+  );
+
+  python.on("close", (code) => {
+    console.error(`Audio worker exited with ${code}`);
+    handleWorkerFailure(python, new Error(`Audio worker exited with ${code}`));
+  });
+  python.on("error", (error) => handleWorkerFailure(python, error));
+  // Writing a job after Python exited but before 'close' fires raises EPIPE here
+  python.stdin.on("error", (error) => {
+    console.error(`Audio worker stdin error: ${error.message}`);
+    handleWorkerFailure(python, error);
+  });
+
+  return python;
+}
+
+export function generateAudio(username, numFiles) {
+  if (!worker) worker = startWorker();
+
+  const id = nextJobId++;
+  const python = worker;
+  return new Promise((resolve, reject) => {
+    const timeoutMs = JOB_TIMEOUT_PER_FILE_MS * Math.max(numFiles, 1);
+    const timer = setTimeout(() => {
+      if (!settleJob(id)) return;
+      reject(new Error(`Audio job ${id} timed out after ${timeoutMs / 1000}s`));
+      // The worker is presumably hung: kill it so the next job starts a fresh one
+      console.error(`Audio job ${id} timed out, restarting audio worker`);
+      if (worker === python) worker = null;
+      python.kill();
+    }, timeoutMs);
+
+    pendingJobs.set(id, { resolve, reject, timer, worker: python });
+    python.stdin.write(
+      JSON.stringify({ id, username, count: numFiles }) + "\n",
+    );
+  });
+}
+
+export function stopAudioWorker() {
+  if (!worker) return;
+  const python = worker;
+  worker = null;
+  failPendingJobs(python, new Error("Audio worker stopped"));
+  python.stdin.end(JSON.stringify({ type: "shutdown" }) + "\n");
+}
@@ -2,8 +2,6 @@ import express from "express";
 import cors from "cors";
 import { createServer } from "http";
 import { WebSocketServer } from "ws";
-import { spawn } from "child_process";
-import path from "path";
 import dotenv from "dotenv";
 import { connectDB } from "./functions/database.js";
 import { handleMessage, handleDisconnect } from "./handlers.js";
@@ -14,6 +12,7 @@ import {
   deletePlayerAudios,
   uploadNewAudios,
 } from "./functions/audio.js";
+import { generateAudio, stopAudioWorker } from "./functions/generator.js";
 import dns from "node:dns/promises";
 
 dns.setServers(["1.1.1.1", "8.8.8.8"]);
@@ -75,13 +74,6 @@ app.get("/api/accounts/all", async (req, res) => {
 });
 
 // API: Generate audio files
-const PYTHON_SCRIPT = path.join(
-  process.cwd(),
-  "..",
-  "audio",
-  "audio_generator_improved.py",
-);
-
 app.post("/api/generate-audio", async (req, res) => {
   const { usernames, numFiles } = req.body;
 
@@ -122,30 +114,7 @@ app.post("/api/generate-audio", async (req, res) => {
       console.log(
         `\n📝 Step 2: Generating ${numFiles} audio file(s) for ${username}...`,
       );
-      await new Promise((resolve, reject) => {
-        const python = spawn(
-          "python",
-          [PYTHON_SCRIPT, username, numFiles.toString()],
-          {
-            env: { ...process.env, PYTHONIOENCODING: "utf-8" },
-          },
-        );
-
-        python.stdout.on("data", (d) =>
-          console.log(`[Python]: ${d.toString().trim()}`),
-        );
-        python.stderr.on("data", (d) =>
-          console.error(`[Python]: ${d.toString().trim()}`),
-        );
-
-        python.on("close", (code) => {
-          code === 0
-            ? resolve()
-            : reject(new Error(`Python exited with ${code}`));
-        });
-
-        python.on("error", reject);
-      });
+      await generateAudio(username, numFiles);
 
       // Step 3: Upload new audio files to S3
       console.log(
@@ -192,3 +161,16 @@ server.listen(PORT, () => {
   console.log(`HTTP: http://localhost:${PORT}`);
   console.log(`WebSocket: ws://localhost:${PORT}/ws`);
 });
+
+// Shutdown: stop the Python audio worker with the server
+function shutdown(signal) {
+  console.log(`\n${signal} received, shutting down...`);
+  stopAudioWorker();
+  wss.close();
+  server.close(() => process.exit(0));
+  // Open keep-alive/WebSocket connections shouldn't hold shutdown up forever
+  setTimeout(() => process.exit(0), 5000).unref();
+}
+
+process.on("SIGINT", () => shutdown("SIGINT"));
+process.on("SIGTERM", () => shutdown("SIGTERM"));
@@ -1,5 +1,3 @@
-import path from "path";
-import { spawn } from "child_process";
 import {
   state,
   audioQueue,
@@ -9,6 +7,7 @@ import {
 } from "./state.js";
 import { broadcastToGroup, broadcastToMasters, sendToBot } from "./utils.js";
 import { deletePlayerAudios, uploadNewAudios } from "./functions/audio.js";
+import { generateAudio } from "./functions/generator.js";
 
 // ===========================
 // BOT SERVICES
@@ -106,12 +105,6 @@ export function removePlayerFromGroup(wss, playerName, groupName) {
 // AUDIO SERVICES
 // ===========================
 
-const PYTHON_SCRIPT = path.join(
-  process.cwd(),
-  "..",
-  "audio",
-  "audio_generator_improved.py",
-);
 const NUM_FILES = 5;
 
 export function addToAudioQueue(players, groupName) {
@@ -170,32 +163,7 @@ async function processAudioGeneration(players) {
 
 async function generateLocalAudio(playerNames, numFiles) {
   for (const username of playerNames) {
-    await new Promise((resolve, reject) => {
-      console.log(`\nStep 2: Generating audio for ${username}...`);
-      console.log(`Running: python ${PYTHON_SCRIPT} ${username} ${numFiles}`);
-
-      const python = spawn(
-        "python",
-        [PYTHON_SCRIPT, username, numFiles.toString()],
-        {
-          env: { ...process.env, PYTHONIOENCODING: "utf-8" },
-        },
-      );
-
-      python.stdout.on("data", (d) =>
-        console.log(`[Python]: ${d.toString().trim()}`),
-      );
-      python.stderr.on("data", (d) =>
-        console.error(`[Python]: ${d.toString().trim()}`),
-      );
-
-      python.on("close", (code) => {
-        code === 0
-          ? resolve()
-          : reject(new Error(`Python exited with ${code}`));
-      });
-
-      python.on("error", reject);
-    });
+    console.log(`\nStep 2: Generating audio for ${username}...`);
+    await generateAudio(username, numFiles);
   }
 }
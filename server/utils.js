@@ -20,6 +20,45 @@ export function parseMessage(raw) {
   }
 }
 
+// Python generators print "PROGRESS {json}" lines alongside regular output
+const PYTHON_EVENT_PREFIX = "PROGRESS ";
+
+export function parsePythonEvent(line) {
+  if (!line.startsWith(PYTHON_EVENT_PREFIX)) return null;
+  return parseMessage(line.slice(PYTHON_EVENT_PREFIX.length));
+}
+
+export function logPythonOutput(data, onEvent) {
+  for (const line of data.toString().split(/\r?\n/)) {
+    if (!line.trim()) continue;
+
+    const event = parsePythonEvent(line);
+    if (!event) {
+      console.log(`[Python]: ${line.trim()}`);
+      continue;
+    }
+
+    if (event.event === "progress") {
+      const pct = Math.round(event.progress * 100);
+      const mins = (event.seconds / 60).toFixed(1);
+      const target = (event.target_seconds / 60).toFixed(1);
+      console.log(
+        `[Python]: ${event.username} v${event.version} ${pct}% (${mins}/${target} min)`,
+      );
+    } else if (event.event === "done") {
+      console.log(`[Python]: ${event.username} v${event.version} done -> ${event.path}`);
+    } else if (event.event === "failed") {
+      console.error(`[Python]: ${event.username} v${event.version} failed: ${event.error}`);
+    } else if (event.event === "ready") {
+      console.log(`[Python]: worker ready (pid ${event.pid})`);
+    } else if (event.event === "result" && !event.ok) {
+      console.error(`[Python]: job ${event.id} failed: ${event.error}`);
+    }
+
+    if (onEvent) onEvent(event);
+  }
+}
+
 // ===========================
 // BROADCAST FUNCTIONS
 // ===========================